@@ -2,11 +2,13 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from config import Config
+from app.caching import Cache
 import os
 
 # Inicializar extensiones
 db = SQLAlchemy()
 login_manager = LoginManager()
+cache = Cache()
 
 def create_app(config_class=Config):
     app = Flask(__name__)
@@ -15,6 +17,25 @@ def create_app(config_class=Config):
     # Inicializar extensiones con la app
     db.init_app(app)
     login_manager.init_app(app)
+    cache.init_app(app)
+    
+    # Política de hash de contraseñas y presupuesto de intentos de inicio de sesión
+    from app.passwords import password_hasher, login_throttle
+    password_hasher.init_app(app)
+    login_throttle.init_app(app)
+    
+    # Identidades de los usuarios autenticados sin consultar la tabla users en cada petición
+    from app.identity import identity_cache
+    identity_cache.init_app(app)
+    
+    # Cuerpo de la página de examen renderizado una vez por versión de actividad
+    from app.fragments import exam_fragments
+    exam_fragments.init_app(app)
+    
+    # PRAGMA de SQLite por conexión (WAL, busy_timeout, etc.) si la configuración los define
+    from app.schema import configure_sqlite
+    configure_sqlite(app)
+    
     login_manager.login_view = 'login'
     login_manager.login_message = 'Por favor inicia sesión para acceder a esta página'
     
@@ -22,13 +43,29 @@ def create_app(config_class=Config):
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
     os.makedirs(os.path.join(app.config['BASEDIR'], 'instance'), exist_ok=True)
     
-    # Registrar rutas
-    with app.app_context():
-        from app import routes
+    # Registrar rutas (en cada aplicación creada, no solo en la primera importación)
+    from app import routes
+    routes.init_routes(app)
+    
+    # Registrar aciertos/fallos de la caché de LogicEngine por petición
+    from app.logic import log_request_cache_stats
+    app.after_request(log_request_cache_stats)
+    
+    # Instrumentación opcional de SQL, LogicEngine y plantillas
+    from app.instrumentation import profiler
+    profiler.init_app(app)
+    
+    # Escritura diferida de resultados (RESULT_WRITE_MODE = 'buffered')
+    from app.writebehind import result_writer
+    result_writer.init_app(app)
+    
+    # Tareas en segundo plano para precalcular paneles (JOBS_ENABLED)
+    from app.jobs import job_runner
+    job_runner.init_app(app)
     
     return app
 
 @login_manager.user_loader
 def load_user(user_id):
-    from app.models import User
-    return User.query.get(int(user_id))
\ No newline at end of file
+    from app.identity import identity_cache
+    return identity_cache.load(int(user_id))
\ No newline at end of file
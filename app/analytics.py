@@ -0,0 +1,293 @@
+import math
+from app.models import Result, Activity
+from app.queries import PASSING_PERCENTAGE
+from app import db
+from sqlalchemy import select, func
+
+# NumPy es opcional: sin él se usan los bucles de Python, con los mismos resultados
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    np = None
+    HAS_NUMPY = False
+
+PERCENTILES = [10, 25, 50, 75, 90]
+HISTOGRAM_BINS = 10  # tramos de 10 puntos entre 0 y 100 %
+# Fracción de estudiantes en los grupos superior e inferior del índice de discriminación
+DISCRIMINATION_GROUP = 0.27
+
+COLUMNS = ['student_id', 'item_id', 'percentage', 'time_spent']
+RESULT_DTYPE = [('student_id', 'i8'), ('item_id', 'i8'), ('percentage', 'f8'), ('time_spent', 'f8')]
+
+
+def load_results(activity_id=None, teacher_id=None, use_numpy=HAS_NUMPY):
+    """Carga en una sola consulta las columnas de resultados de una actividad o un docente.
+
+    Devuelve un dict columna -> arreglo de NumPy (o lista). `item_id` es la
+    actividad de cada resultado; time_spent vacío queda como 0.
+    """
+    statement = select(Result.student_id, Result.activity_id, Result.percentage,
+                       func.coalesce(Result.time_spent, 0))
+    if activity_id is not None:
+        statement = statement.where(Result.activity_id == activity_id)
+    if teacher_id is not None:
+        statement = statement.join(Activity, Activity.id == Result.activity_id).where(
+            Activity.teacher_id == teacher_id
+        )
+
+    # Se leen las tuplas del cursor del driver: construir un Row de SQLAlchemy
+    # por resultado cuesta más que todo el cálculo posterior
+    result = db.session.connection().execute(statement)
+    try:
+        if use_numpy:
+            rows = np.fromiter(result.cursor, dtype=RESULT_DTYPE)
+            return {column: rows[column] for column in COLUMNS}
+        values = list(zip(*result.cursor))
+    finally:
+        result.close()
+    return dict(zip(COLUMNS, values)) if values else {column: () for column in COLUMNS}
+
+
+# ==================== DISTRIBUCIONES ====================
+
+def _empty_description():
+    return {'count': 0, 'mean': 0, 'std': 0, 'min': 0, 'max': 0,
+            'percentiles': {f'p{p}': 0 for p in PERCENTILES}, 'histogram': [0] * HISTOGRAM_BINS}
+
+
+def _describe_numpy(values):
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    if values.size == 0:
+        return _empty_description()
+    histogram, _ = np.histogram(np.clip(values, 0, 100), bins=HISTOGRAM_BINS, range=(0, 100))
+    return {
+        'count': int(values.size),
+        'mean': float(values.mean()),
+        'std': float(values.std()),
+        'min': float(values.min()),
+        'max': float(values.max()),
+        'percentiles': {f'p{p}': float(v) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))},
+        'histogram': [int(count) for count in histogram]
+    }
+
+
+def _percentile(ordered, p):
+    """Percentil con interpolación lineal, igual que numpy.percentile"""
+    position = (len(ordered) - 1) * p / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def _describe_python(values):
+    values = sorted(v for v in values if v is not None and not math.isnan(v))
+    if not values:
+        return _empty_description()
+    count = len(values)
+    mean = sum(values) / count
+    histogram = [0] * HISTOGRAM_BINS
+    width = 100 / HISTOGRAM_BINS
+    for value in values:
+        histogram[min(max(int(value // width), 0), HISTOGRAM_BINS - 1)] += 1
+    return {
+        'count': count,
+        'mean': mean,
+        'std': math.sqrt(sum((v - mean) ** 2 for v in values) / count),
+        'min': values[0],
+        'max': values[-1],
+        'percentiles': {f'p{p}': _percentile(values, p) for p in PERCENTILES},
+        'histogram': histogram
+    }
+
+
+def describe(values, use_numpy=HAS_NUMPY):
+    """Media, desviación estándar, percentiles e histograma de porcentajes (0-100)"""
+    return _describe_numpy(values) if use_numpy else _describe_python(values)
+
+
+# ==================== ANÁLISIS DE ÍTEMS ====================
+
+def _item_analysis_numpy(columns, passing):
+    students, student_index = np.unique(columns['student_id'], return_inverse=True)
+    items, item_index = np.unique(columns['item_id'], return_inverse=True)
+    if items.size == 0:
+        return {}
+    percentage = np.asarray(columns['percentage'], dtype=float)
+    passed = (percentage >= passing).astype(float)
+
+    # Habilidad de cada estudiante: su porcentaje medio en el conjunto
+    ability = np.bincount(student_index, weights=percentage) / np.bincount(student_index)
+    order = np.argsort(ability, kind='stable')
+    group = max(1, int(round(len(students) * DISCRIMINATION_GROUP)))
+    in_lower = np.zeros(len(students), dtype=bool)
+    in_upper = np.zeros(len(students), dtype=bool)
+    in_lower[order[:group]] = True
+    in_upper[order[-group:]] = True
+
+    attempts = np.bincount(item_index, minlength=items.size)
+    difficulty = np.bincount(item_index, weights=passed, minlength=items.size) / attempts
+
+    def pass_rate(mask):
+        total = np.bincount(item_index[mask], minlength=items.size)
+        hits = np.bincount(item_index[mask], weights=passed[mask], minlength=items.size)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(total > 0, hits / np.maximum(total, 1), np.nan)
+
+    discrimination = pass_rate(in_upper[student_index]) - pass_rate(in_lower[student_index])
+    return {
+        int(item): {
+            'attempts': int(attempts[i]),
+            'difficulty': float(difficulty[i]),
+            'discrimination': None if np.isnan(discrimination[i]) else float(discrimination[i])
+        }
+        for i, item in enumerate(items)
+    }
+
+
+def _item_analysis_python(columns, passing):
+    sums, counts = {}, {}
+    for student_id, percentage in zip(columns['student_id'], columns['percentage']):
+        sums[student_id] = sums.get(student_id, 0) + percentage
+        counts[student_id] = counts.get(student_id, 0) + 1
+    if not sums:
+        return {}
+    order = sorted(sums, key=lambda s: (sums[s] / counts[s], s))  # empates por id, como np.unique
+    group = max(1, int(round(len(order) * DISCRIMINATION_GROUP)))
+    lower, upper = set(order[:group]), set(order[-group:])
+
+    stats = {}
+    for student_id, item_id, percentage in zip(columns['student_id'], columns['item_id'], columns['percentage']):
+        item = stats.setdefault(item_id, [0, 0, 0, 0, 0, 0])  # intentos, aprobados, sup, sup ok, inf, inf ok
+        ok = percentage >= passing
+        item[0] += 1
+        item[1] += ok
+        if student_id in upper:
+            item[2] += 1
+            item[3] += ok
+        if student_id in lower:
+            item[4] += 1
+            item[5] += ok
+
+    return {
+        item_id: {
+            'attempts': n,
+            'difficulty': passed / n,
+            'discrimination': (upper_ok / upper_n - lower_ok / lower_n) if upper_n and lower_n else None
+        }
+        for item_id, (n, passed, upper_n, upper_ok, lower_n, lower_ok) in sorted(stats.items())
+    }
+
+
+def item_analysis(columns, passing=PASSING_PERCENTAGE, use_numpy=HAS_NUMPY):
+    """Índice de dificultad y de discriminación de cada ítem.
+
+    La dificultad es la proporción de intentos aprobados (más alta = más fácil).
+    La discriminación es la diferencia de esa proporción entre el 27 % de
+    estudiantes con mejor porcentaje medio y el 27 % con peor: cerca de 0 o
+    negativa indica un ítem que no distingue a quienes dominan el tema.
+    """
+    if use_numpy:
+        return _item_analysis_numpy(columns, passing)
+    return _item_analysis_python(columns, passing)
+
+
+# ==================== ANÁLISIS DE PREGUNTAS ====================
+
+def load_answers(activity_id):
+    """Porcentaje y vector de respuestas de cada resultado de la actividad que los guardó"""
+    statement = select(Result.percentage, Result.answers).where(
+        Result.activity_id == activity_id, Result.answers.isnot(None)
+    )
+    result = db.session.connection().execute(statement)
+    try:
+        return list(result.cursor)
+    finally:
+        result.close()
+
+
+def _question_discrimination_numpy(rows, correct_codes):
+    questions = len(correct_codes)
+    percentage = np.fromiter((p for p, _ in rows), dtype=float, count=len(rows))
+    lengths = np.fromiter((len(packed) for _, packed in rows), dtype=int, count=len(rows))
+    # Matriz resultados x preguntas; los vectores anteriores a una pregunta nueva se rellenan con 0
+    matrix = np.frombuffer(b''.join(bytes(packed[:questions]).ljust(questions, b'\0') for _, packed in rows),
+                           dtype=np.uint8).reshape(len(rows), questions)
+    present = np.arange(questions) < lengths[:, None]
+    correct = (matrix == np.asarray(correct_codes, dtype=np.uint8)) & present
+
+    order = np.argsort(percentage, kind='stable')
+    group = max(1, int(round(len(rows) * DISCRIMINATION_GROUP)))
+
+    def correct_rate(indexes):
+        total = present[indexes].sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(total > 0, correct[indexes].sum(axis=0) / np.maximum(total, 1), np.nan)
+
+    discrimination = correct_rate(order[-group:]) - correct_rate(order[:group])
+    return [None if np.isnan(value) else float(value) for value in discrimination]
+
+
+def _question_discrimination_python(rows, correct_codes):
+    order = sorted(range(len(rows)), key=lambda i: (rows[i][0], i))  # mismo orden que argsort estable
+    group = max(1, int(round(len(rows) * DISCRIMINATION_GROUP)))
+
+    def correct_rate(indexes, position):
+        answered = [rows[i][1][position] for i in indexes if len(rows[i][1]) > position]
+        if not answered:
+            return None
+        return sum(code == correct_codes[position] for code in answered) / len(answered)
+
+    discrimination = []
+    for position in range(len(correct_codes)):
+        upper, lower = correct_rate(order[-group:], position), correct_rate(order[:group], position)
+        discrimination.append(upper - lower if upper is not None and lower is not None else None)
+    return discrimination
+
+
+def question_discrimination(activity_id, question_ids, correct_codes, use_numpy=HAS_NUMPY):
+    """Índice de discriminación de cada pregunta de una actividad.
+
+    Compara la proporción de aciertos en la pregunta entre el 27 % de intentos
+    con mejor porcentaje y el 27 % con peor. `correct_codes` es el código de la
+    opción correcta de cada pregunta en el orden de `question_ids` (el del
+    vector de respuestas). Devuelve {id de pregunta: índice o None}.
+    """
+    rows = load_answers(activity_id)
+    if not rows or not question_ids:
+        return {question_id: None for question_id in question_ids}
+    if use_numpy:
+        values = _question_discrimination_numpy(rows, correct_codes)
+    else:
+        values = _question_discrimination_python(rows, correct_codes)
+    return dict(zip(question_ids, values))
+
+
+# ==================== RESÚMENES PARA LAS VISTAS ====================
+
+def activity_distribution(activity_id, use_numpy=HAS_NUMPY):
+    """Distribución de porcentajes y de tiempos de una actividad"""
+    columns = load_results(activity_id=activity_id, use_numpy=use_numpy)
+    return {
+        'scores': describe(columns['percentage'], use_numpy),
+        'median_time': _median_time(columns['time_spent'], use_numpy)
+    }
+
+
+def cohort_analytics(teacher_id, use_numpy=HAS_NUMPY):
+    """Distribución de todos los resultados del docente y análisis de sus actividades"""
+    columns = load_results(teacher_id=teacher_id, use_numpy=use_numpy)
+    return {
+        'scores': describe(columns['percentage'], use_numpy),
+        'items': item_analysis(columns, use_numpy=use_numpy)
+    }
+
+
+def _median_time(times, use_numpy):
+    if use_numpy:
+        times = np.asarray(times, dtype=float)
+        times = times[times > 0]
+        return float(np.median(times)) if times.size else 0
+    times = sorted(t for t in times if t)
+    return _percentile(times, 50) if times else 0
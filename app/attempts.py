@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from app.models import Attempt
+from app.grading import new_exam_seed
+from app import db
+
+OPEN, SUBMITTED, EXPIRED = 'open', 'submitted', 'expired'
+# Intentos que el barrido marca como vencidos en cada transacción
+SWEEP_BATCH_SIZE = 500
+
+
+def _latest(student_id, activity_id, statuses=None):
+    query = Attempt.query.filter(Attempt.student_id == student_id, Attempt.activity_id == activity_id)
+    if statuses is not None:
+        query = query.filter(Attempt.status.in_(statuses))
+    return query.order_by(Attempt.started_at.desc(), Attempt.id.desc()).first()
+
+
+def start_attempt(student_id, activity_id, shuffle=True, max_age=None, now=None):
+    """Intento abierto del estudiante en la actividad; si no hay uno vigente, lo crea.
+
+    Recargar el examen reutiliza el intento (misma hora de inicio y mismo
+    orden de preguntas). Uno abierto hace más de max_age segundos se marca
+    vencido y se empieza otro. Solo hace commit si crea o vence un intento.
+    """
+    now = now or datetime.utcnow()
+    attempt = _latest(student_id, activity_id, [OPEN])
+    if attempt is not None and max_age and attempt.started_at < now - timedelta(seconds=max_age):
+        attempt.status = EXPIRED
+        attempt = None
+    if attempt is None:
+        attempt = Attempt(student_id=student_id, activity_id=activity_id, status=OPEN,
+                          seed=new_exam_seed() if shuffle else None, started_at=now)
+        db.session.add(attempt)
+        db.session.commit()
+    return attempt
+
+
+def finish_attempt(student_id, activity_id, now=None):
+    """Marca como enviado el último intento sin enviar del estudiante en la actividad.
+
+    Solo se considera el último intento: si está vencido se acepta igual (el
+    barrido no impide enviar un examen que sigue en pantalla), pero uno
+    vencido al que ya sucedió otro, o uno ya enviado, no. Devuelve (intento,
+    número de intentos enviados contando este), o (None, None) si el último
+    intento no admite envío. No hace commit.
+    """
+    attempt = _latest(student_id, activity_id)
+    if attempt is None or attempt.status not in (OPEN, EXPIRED):
+        return None, None
+    attempt.status = SUBMITTED
+    attempt.submitted_at = now or datetime.utcnow()
+    db.session.flush()
+    submitted = Attempt.query.filter_by(student_id=student_id, activity_id=activity_id, status=SUBMITTED).count()
+    return attempt, submitted
+
+
+def time_spent(attempt, now=None):
+    """Segundos entre la apertura y el envío del intento"""
+    return max(0, int(((attempt.submitted_at or now or datetime.utcnow()) - attempt.started_at).total_seconds()))
+
+
+def expire_stale_attempts(max_age, batch_size=SWEEP_BATCH_SIZE, now=None):
+    """Marca como vencidos los intentos abiertos hace más de max_age segundos.
+
+    Avanza por lotes de batch_size con una transacción corta cada uno, para no
+    bloquear los envíos de exámenes mientras barre. Devuelve cuántos venció.
+    """
+    cutoff = (now or datetime.utcnow()) - timedelta(seconds=max_age)
+    expired = 0
+    while True:
+        ids = [attempt_id for (attempt_id,) in db.session.query(Attempt.id).filter(
+            Attempt.status == OPEN, Attempt.started_at < cutoff
+        ).order_by(Attempt.started_at).limit(batch_size)]
+        if not ids:
+            break
+        expired += db.session.execute(update(Attempt).where(
+            Attempt.id.in_(ids), Attempt.status == OPEN
+        ).values(status=EXPIRED)).rowcount
+        db.session.commit()
+        if len(ids) < batch_size:
+            break
+    return expired
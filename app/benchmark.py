@@ -0,0 +1,273 @@
+import sys
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+# Permite ejecutar el script directamente (python app/benchmark.py).
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from sqlalchemy import func
+from config import Config
+from app import create_app, db
+from app.models import User, Activity, Question, Result
+from app.logic import LogicEngine
+from app.schema import upgrade_schema
+from app.seeding import SeedParams, seed, PASSWORDS
+from app.stats import rebuild_stats
+from app.instrumentation import QueryCounter
+from app.attempts import start_attempt
+
+DEFAULT_SIZES = [1000, 100000, 1000000]
+
+
+def params_for(size, seed_value):
+    """Escala el curso sintético para obtener ~`size` resultados"""
+    students = max(100, size // 50)
+    return SeedParams(
+        teachers=max(5, students // 200),
+        students=students,
+        activities=20,
+        questions=10,
+        results=max(1, size // students),
+        seed=seed_value
+    )
+
+
+def build_app(db_path, cache_backend):
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + db_path
+        CACHE_BACKEND = cache_backend
+        WTF_CSRF_ENABLED = False
+        TESTING = True
+    return create_app(BenchmarkConfig)
+
+
+def pick_targets():
+    """Elige un docente, una actividad suya con muchos intentos y un estudiante activo"""
+    activity_id, teacher_id = db.session.query(Result.activity_id, Activity.teacher_id).join(
+        Activity, Activity.id == Result.activity_id
+    ).group_by(Result.activity_id, Activity.teacher_id).order_by(func.count(Result.id).desc()).first()
+    student_id = db.session.query(Result.student_id).group_by(Result.student_id).order_by(
+        func.count(Result.id).desc()
+    ).first()[0]
+    admin = User(username='bench_admin', email='bench_admin@seed.local', role='admin')
+    admin.set_password(PASSWORDS['teacher'])
+    db.session.add(admin)
+    db.session.commit()
+    return {
+        'teacher': db.session.get(User, teacher_id).username,
+        'teacher_id': teacher_id,
+        'student': db.session.get(User, student_id).username,
+        'student_id': student_id,
+        'admin': admin.username,
+        'activity_id': activity_id,
+        'question_ids': [q for (q,) in db.session.query(Question.id).filter_by(activity_id=activity_id)]
+    }
+
+
+def measure(call, repeat, engine):
+    """Ejecuta `call` varias veces: latencias p50/p95, sentencias SQL y memoria pico"""
+    latencies = []
+    statements = []
+    for _ in range(repeat):
+        with QueryCounter(engine) as counter:
+            start = time.perf_counter()
+            call()
+            latencies.append((time.perf_counter() - start) * 1000)
+        statements.append(counter.count)
+
+    # La memoria se mide en una pasada aparte porque tracemalloc ralentiza la ejecución
+    tracemalloc.start()
+    call()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        'p50_ms': round(statistics.median(latencies), 3),
+        'p95_ms': round(latencies[min(len(latencies) - 1, int(round(0.95 * (len(latencies) - 1))))], 3),
+        'sql_statements': int(statistics.median(statements)),
+        'peak_memory_kb': round(peak / 1024, 1)
+    }
+
+
+def login(app, username):
+    client = app.test_client()
+    response = client.post('/login', data={'username': username, 'password': _password_for(username)})
+    if response.status_code != 302:
+        raise RuntimeError(f'No se pudo iniciar sesión como {username}')
+    return client
+
+
+def _password_for(username):
+    return PASSWORDS['student'] if username.startswith('estudiante') else PASSWORDS['teacher']
+
+
+def route_cases(app, targets):
+    student = login(app, targets['student'])
+    teacher = login(app, targets['teacher'])
+    admin = login(app, targets['admin'])
+    activity_id = targets['activity_id']
+    answers = {f'question_{q}': 'a' for q in targets['question_ids']}
+
+    def get(client, url):
+        def call():
+            response = client.get(url)
+            assert response.status_code == 200, (url, response.status_code)
+        return call
+
+    def submit():
+        # Cada envío necesita un intento abierto, como si el estudiante hubiera abierto el examen
+        with app.app_context():
+            start_attempt(targets['student_id'], activity_id, shuffle=False)
+        response = student.post(f'/student/activity/{activity_id}', data=answers)
+        assert response.status_code == 302, response.status_code
+
+    return [
+        ('GET /student/dashboard', get(student, '/student/dashboard')),
+        ('GET /student/activity/<id>', get(student, f'/student/activity/{activity_id}')),
+        ('POST /student/activity/<id>', submit),
+        ('GET /teacher/dashboard', get(teacher, '/teacher/dashboard')),
+        ('GET /teacher/students', get(teacher, '/teacher/students')),
+        ('GET /teacher/activity/<id>/stats', get(teacher, f'/teacher/activity/{activity_id}/stats')),
+        ('GET /admin/dashboard', get(admin, '/admin/dashboard')),
+        ('GET /admin/users', get(admin, '/admin/users')),
+    ]
+
+
+def logic_cases(app, targets):
+    student_id = targets['student_id']
+    teacher_id = targets['teacher_id']
+    activity_id = targets['activity_id']
+
+    def in_context(call):
+        # Cada llamada en su propio contexto, como sucede en una petición
+        def wrapped():
+            with app.app_context():
+                call()
+        return wrapped
+
+    return [(name, in_context(call)) for name, call in [
+        ('LogicEngine.calculate_student_average', lambda: LogicEngine.calculate_student_average(student_id)),
+        ('LogicEngine.get_student_performance_level', lambda: LogicEngine.get_student_performance_level(student_id)),
+        ('LogicEngine.get_recommendations', lambda: LogicEngine.get_recommendations(student_id)),
+        ('LogicEngine.adjust_difficulty', lambda: LogicEngine.adjust_difficulty(student_id)),
+        ('LogicEngine.get_activity_recommendations', lambda: LogicEngine.get_activity_recommendations(student_id)),
+        ('LogicEngine.get_teacher_roster', lambda: LogicEngine.get_teacher_roster(teacher_id)),
+        ('LogicEngine.detect_struggling_students', lambda: LogicEngine.detect_struggling_students(teacher_id)),
+        ('LogicEngine.get_activity_stats', lambda: LogicEngine.get_activity_stats(activity_id)),
+        ('LogicEngine.get_teacher_overview', lambda: LogicEngine.get_teacher_overview(teacher_id)),
+        ('LogicEngine.get_question_analysis', lambda: LogicEngine.get_question_analysis(activity_id)),
+        ('LogicEngine.get_failing_questions', lambda: LogicEngine.get_failing_questions(teacher_id)),
+        ('LogicEngine.get_cohort_analytics', lambda: LogicEngine.get_cohort_analytics(teacher_id)),
+        ('LogicEngine.get_platform_counts', lambda: LogicEngine.get_platform_counts()),
+    ]]
+
+
+def run_size(size, args):
+    tmp_dir = tempfile.mkdtemp()
+    app = build_app(os.path.join(tmp_dir, 'benchmark.db'), args.cache)
+    report = {}
+    with app.app_context():
+        upgrade_schema()
+        started = time.perf_counter()
+        counts = seed(params_for(size, args.seed), log=lambda message: None)
+        rebuild_stats()
+        print(f"   {counts.get('results', 0)} resultados generados en {time.perf_counter() - started:.1f} s")
+        targets = pick_targets()
+        engine = db.engine
+
+    # Las peticiones se hacen fuera de un contexto compartido para que cada una
+    # tenga su propio flask.g y su propia sesión, igual que en producción.
+    for name, call in logic_cases(app, targets) + route_cases(app, targets):
+        report[name] = measure(call, args.repeat, engine)
+        print(f"   {name:<45} p50 {report[name]['p50_ms']:>9.2f} ms  "
+              f"p95 {report[name]['p95_ms']:>9.2f} ms  "
+              f"sql {report[name]['sql_statements']:>4}  "
+              f"mem {report[name]['peak_memory_kb']:>9.1f} KB")
+    engine.dispose()
+    return {'results': counts.get('results', 0), 'cases': report}
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous_path, current, threshold):
+    """Imprime los casos cuyo p50 o número de consultas empeoró más del umbral"""
+    with open(previous_path, encoding='utf-8') as f:
+        previous = json.load(f)
+    regressions = 0
+    for size, data in current['sizes'].items():
+        old_cases = previous.get('sizes', {}).get(size, {}).get('cases', {})
+        for name, metrics in data['cases'].items():
+            old = old_cases.get(name)
+            if not old:
+                continue
+            slower = old['p50_ms'] and metrics['p50_ms'] > old['p50_ms'] * (1 + threshold)
+            more_sql = metrics['sql_statements'] > old['sql_statements']
+            if slower or more_sql:
+                regressions += 1
+                print(f"   ⚠️ {size} {name}: p50 {old['p50_ms']} → {metrics['p50_ms']} ms, "
+                      f"sql {old['sql_statements']} → {metrics['sql_statements']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de rutas y LogicEngine')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='Cantidad aproximada de resultados por escenario')
+    parser.add_argument('--repeat', type=int, default=20, help='Repeticiones por caso')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--cache', default='null', choices=['null', 'memory'],
+                        help='Backend de caché durante la medición (null mide el camino sin caché)')
+    parser.add_argument('--output', default='benchmark.json', help='Archivo JSON de salida')
+    parser.add_argument('--compare', help='JSON de una ejecución anterior para detectar regresiones')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Empeoramiento relativo de p50 considerado regresión')
+    args = parser.parse_args()
+
+    output = {
+        'meta': {
+            'revision': git_revision(),
+            'created_at': datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+            'cache': args.cache,
+            'seed': args.seed
+        },
+        'sizes': {}
+    }
+    for size in args.sizes:
+        print(f"📊 Escenario con ~{size} resultados")
+        output['sizes'][str(size)] = run_size(size, args)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(output, f, indent=2, ensure_ascii=False)
+    print(f"✅ Resultados guardados en {args.output}")
+
+    if args.compare:
+        regressions = compare(args.compare, output, args.threshold)
+        if regressions:
+            print(f"❌ {regressions} regresiones respecto a {args.compare}")
+            sys.exit(1)
+        print("✅ Sin regresiones")
+
+
+if __name__ == '__main__':
+    main()
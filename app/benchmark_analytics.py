@@ -0,0 +1,60 @@
+import sys
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+# Permite ejecutar el script directamente (python app/benchmark_analytics.py).
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from app import db
+from app import analytics
+from app.schema import upgrade_schema
+from app.seeding import seed
+from app.benchmark import params_for, build_app
+
+
+def timed(call, repeat):
+    """Mejor tiempo de `repeat` ejecuciones, en ms"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = call()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, value
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Analíticas vectorizadas (NumPy) frente a bucles de Python')
+    parser.add_argument('--size', type=int, default=1000000, help='Cantidad aproximada de resultados')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    backends = [True, False] if analytics.HAS_NUMPY else [False]
+    if not analytics.HAS_NUMPY:
+        print("⚠️ NumPy no está instalado: solo se mide la versión en Python puro")
+
+    app = build_app(os.path.join(tempfile.mkdtemp(), 'analytics.db'), 'null')
+    with app.app_context():
+        upgrade_schema()
+        counts = seed(params_for(args.size, args.seed), log=lambda message: None)
+        print(f"📊 {counts.get('results', 0)} resultados")
+
+        for use_numpy in backends:
+            name = 'numpy' if use_numpy else 'python'
+            load_ms, columns = timed(lambda: analytics.load_results(use_numpy=use_numpy), args.repeat)
+            describe_ms, description = timed(lambda: analytics.describe(columns['percentage'], use_numpy), args.repeat)
+            items_ms, items = timed(lambda: analytics.item_analysis(columns, use_numpy=use_numpy), args.repeat)
+            print(f"   {name:<7} carga {load_ms:>9.1f} ms   distribución {describe_ms:>9.1f} ms   "
+                  f"ítems {items_ms:>9.1f} ms   (media {description['mean']:.2f}, "
+                  f"desv. {description['std']:.2f}, {len(items)} ítems)")
+        db.engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+import sys
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Permite ejecutar el script directamente (python app/benchmark_concurrency.py).
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from sqlalchemy import func
+from config import get_config, CONFIGS
+from app import create_app, db
+from app.models import User, Result
+from app.schema import upgrade_schema, sqlite_settings
+from app.seeding import seed
+from app.stats import rebuild_stats
+from app.writebehind import result_writer
+from app.benchmark import params_for, pick_targets, login
+
+WRITE_MODES = ['sync', 'buffered']
+
+
+def build_app(profile, write_mode, db_path):
+    class ConcurrencyConfig(get_config(profile)):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + db_path
+        CACHE_BACKEND = 'null'
+        RESULT_WRITE_MODE = write_mode
+        RESULT_SPOOL_DIR = os.path.join(os.path.dirname(db_path), 'spool')
+        WTF_CSRF_ENABLED = False
+        TESTING = True
+    return create_app(ConcurrencyConfig)
+
+
+def busiest_students(limit):
+    """Estudiantes con resultados, para que cada hilo escritor use una sesión distinta"""
+    rows = db.session.query(User.username).join(Result, Result.student_id == User.id).group_by(
+        User.id
+    ).order_by(func.count(Result.id).desc()).limit(limit)
+    return [username for (username,) in rows]
+
+
+def run_profile(profile, write_mode, args):
+    tmp_dir = tempfile.mkdtemp()
+    app = build_app(profile, write_mode, os.path.join(tmp_dir, 'concurrency.db'))
+    with app.app_context():
+        upgrade_schema()
+        seed(params_for(args.size, args.seed), log=lambda message: None)
+        rebuild_stats()
+        seeded_results = Result.query.count()
+        targets = pick_targets()
+        students = busiest_students(args.writers)
+        settings = sqlite_settings()
+        engine = db.engine
+
+    activity_id = targets['activity_id']
+    answers = {f'question_{q}': 'a' for q in targets['question_ids']}
+    writer_clients = [login(app, username) for username in students]
+    reader_clients = [login(app, targets['teacher']) for _ in range(args.readers)]
+
+    lock = threading.Lock()
+    totals = {'submissions': 0, 'reads': 0, 'errors': 0}
+    submit_latencies = []
+    read_latencies = []
+    deadline = time.perf_counter() + args.duration
+
+    def writer(client):
+        while time.perf_counter() < deadline:
+            try:
+                # Abrir el examen registra el intento que el envío cierra; no se mide
+                client.get(f'/student/activity/{activity_id}')
+            except Exception:
+                pass
+            start = time.perf_counter()
+            try:
+                ok = client.post(f'/student/activity/{activity_id}', data=answers).status_code == 302
+            except Exception:  # "database is locked" llega como OperationalError con TESTING
+                ok = False
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                totals['submissions' if ok else 'errors'] += 1
+                if ok:
+                    submit_latencies.append(elapsed)
+
+    def reader(client):
+        urls = [f'/teacher/activity/{activity_id}/stats', '/teacher/dashboard', '/teacher/students']
+        index = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                ok = client.get(urls[index % len(urls)]).status_code == 200
+            except Exception:
+                ok = False
+            elapsed = (time.perf_counter() - start) * 1000
+            index += 1
+            with lock:
+                totals['reads' if ok else 'errors'] += 1
+                if ok:
+                    read_latencies.append(elapsed)
+
+    threads = [threading.Thread(target=writer, args=(c,)) for c in writer_clients]
+    threads += [threading.Thread(target=reader, args=(c,)) for c in reader_clients]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Con escritura diferida un envío aceptado todavía no está guardado:
+    # se mide también cuánto tarda en vaciarse la cola y se comprueba que no falte ninguno
+    started = time.perf_counter()
+    result_writer.stop()
+    drain_seconds = time.perf_counter() - started
+    with app.app_context():
+        persisted = Result.query.count() - seeded_results
+    engine.dispose()
+
+    def p95(values):
+        values = sorted(values)
+        return round(values[min(len(values) - 1, int(round(0.95 * (len(values) - 1))))], 1) if values else None
+
+    return {
+        'settings': settings,
+        'submissions_per_second': round(totals['submissions'] / args.duration, 1),
+        'persisted_per_second': round(persisted / (args.duration + drain_seconds), 1),
+        'missing': totals['submissions'] - persisted,
+        'reads_per_second': round(totals['reads'] / args.duration, 1),
+        'errors': totals['errors'],
+        'submit_p50_ms': round(statistics.median(submit_latencies), 1) if submit_latencies else None,
+        'submit_p95_ms': p95(submit_latencies),
+        'read_p95_ms': p95(read_latencies)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Envíos de actividades simultáneos a lecturas de paneles, por perfil y modo de escritura'
+    )
+    parser.add_argument('--profiles', nargs='+', default=list(CONFIGS), choices=list(CONFIGS))
+    parser.add_argument('--write-modes', nargs='+', default=WRITE_MODES, choices=WRITE_MODES,
+                        help='sync: un commit por envío; buffered: escritura diferida por lotes')
+    parser.add_argument('--size', type=int, default=100000, help='Cantidad aproximada de resultados')
+    parser.add_argument('--writers', type=int, default=4, help='Hilos enviando actividades')
+    parser.add_argument('--readers', type=int, default=4, help='Hilos leyendo paneles del docente')
+    parser.add_argument('--duration', type=float, default=10, help='Segundos de carga por perfil')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    for profile in args.profiles:
+        for write_mode in args.write_modes:
+            print(f"📊 Perfil {profile}, escritura {write_mode}: {args.writers} escritores, "
+                  f"{args.readers} lectores, {args.duration:.0f} s, ~{args.size} resultados")
+            report = run_profile(profile, write_mode, args)
+            print(f"   PRAGMA: {report['settings']}")
+            print(f"   envíos/s {report['submissions_per_second']:>8}   guardados/s {report['persisted_per_second']:>8}   "
+                  f"lecturas/s {report['reads_per_second']:>8}   errores {report['errors']}   "
+                  f"sin guardar {report['missing']}")
+            print(f"   envío p50 {report['submit_p50_ms']} ms  p95 {report['submit_p95_ms']} ms   "
+                  f"lectura p95 {report['read_p95_ms']} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+import sys
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+# Permite ejecutar el script directamente (python app/benchmark_logic.py).
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from sqlalchemy import func
+from config import Config
+from app import create_app, db
+from app.models import User, Result
+from app.seeding import SeedParams, seed as seed_data
+from app.logic import LogicEngine
+from app.stats import rebuild_stats
+from app.instrumentation import QueryCounter
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+
+def build_config(db_path):
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + db_path
+        CACHE_BACKEND = 'null'  # medir siempre las consultas, no la caché
+    return BenchmarkConfig
+
+
+def populate(total_results, teachers=5, students=500, activities_per_teacher=10, seed=42):
+    """Genera datos sintéticos y devuelve ids representativos para medir"""
+    seed_data(SeedParams(teachers=teachers, students=students, activities=activities_per_teacher,
+                         questions=5, results=max(1, total_results // students), seed=seed),
+              log=lambda message: None)
+    rebuild_stats()
+
+    teacher_id = db.session.query(func.min(User.id)).filter(User.role == 'teacher').scalar()
+    student_id, activity_id = db.session.query(Result.student_id, Result.activity_id).first()
+    return teacher_id, student_id, activity_id
+
+
+def measure(method, *args, repeat=3):
+    """Devuelve (consultas SQL, mejor latencia en ms) de una llamada"""
+    best = None
+    for _ in range(repeat):
+        with QueryCounter() as counter:
+            start = time.perf_counter()
+            method(*args)
+            elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+        db.session.expire_all()
+    return counter.count, best
+
+
+def run(sizes):
+    print(f"{'resultados':>10} | {'método':<28} | {'consultas':>9} | {'ms':>10}")
+    print('-' * 66)
+    for size in sizes:
+        tmp_dir = tempfile.mkdtemp()
+        app = create_app(build_config(os.path.join(tmp_dir, 'benchmark.db')))
+        with app.app_context():
+            db.create_all()
+            teacher_id, student_id, activity_id = populate(size)
+            cases = [
+                ('calculate_student_average', LogicEngine.calculate_student_average, student_id),
+                ('get_activity_stats', LogicEngine.get_activity_stats, activity_id),
+                ('detect_struggling_students', LogicEngine.detect_struggling_students, teacher_id),
+                ('get_teacher_overview', LogicEngine.get_teacher_overview, teacher_id),
+                ('get_teacher_roster', LogicEngine.get_teacher_roster, teacher_id),
+            ]
+            for name, method, arg in cases:
+                queries, ms = measure(method, arg)
+                print(f'{size:>10} | {name:<28} | {queries:>9} | {ms:>10.2f}')
+            db.session.remove()
+            db.engine.dispose()
+        print('-' * 66)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark de LogicEngine')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='Cantidades de resultados a generar (p. ej. 1000 100000 1000000)')
+    run(parser.parse_args().sizes)
@@ -0,0 +1,129 @@
+import sys
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Permite ejecutar el script directamente (python app/benchmark_login.py).
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from werkzeug.security import generate_password_hash
+from config import Config, ProductionConfig
+from app import create_app, db
+from app.models import User
+from app.schema import upgrade_schema
+from app.seeding import SeedParams, seed, PASSWORDS
+from app.passwords import DEFAULT_METHOD
+
+METHODS = [DEFAULT_METHOD, ProductionConfig.PASSWORD_HASH_METHOD, Config.PASSWORD_HASH_METHOD]
+
+
+def build_app(db_path, method, workers):
+    class LoginConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + db_path
+        CACHE_BACKEND = 'null'
+        PASSWORD_HASH_METHOD = method
+        PASSWORD_HASH_WORKERS = workers
+        WTF_CSRF_ENABLED = False
+        TESTING = True
+    return create_app(LoginConfig)
+
+
+def p95(values):
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(round(0.95 * (len(values) - 1))))], 1) if values else None
+
+
+def run_logins(app, usernames, threads, duration):
+    """Inicios de sesión simultáneos durante `duration` segundos, repartiendo los usuarios"""
+    lock = threading.Lock()
+    latencies = []
+    totals = {'ok': 0, 'busy': 0, 'errors': 0}
+    deadline = time.perf_counter() + duration
+
+    def worker(offset):
+        index = offset
+        while time.perf_counter() < deadline:
+            client = app.test_client()
+            start = time.perf_counter()
+            status = client.post('/login', data={
+                'username': usernames[index % len(usernames)], 'password': PASSWORDS['student']
+            }).status_code
+            elapsed = (time.perf_counter() - start) * 1000
+            index += threads
+            with lock:
+                if status == 302:
+                    totals['ok'] += 1
+                    latencies.append(elapsed)
+                else:
+                    totals['busy' if status == 503 else 'errors'] += 1
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    return {
+        'logins_per_second': round(totals['ok'] / duration, 1),
+        'p50_ms': round(statistics.median(latencies), 1) if latencies else None,
+        'p95_ms': p95(latencies),
+        'busy': totals['busy'],
+        'errors': totals['errors']
+    }
+
+
+def run_method(method, args):
+    app = build_app(os.path.join(tempfile.mkdtemp(), 'login.db'), method, args.hash_workers)
+    with app.app_context():
+        upgrade_schema()
+        seed(SeedParams(teachers=1, students=args.users, activities=1, questions=1, results=0, seed=args.seed),
+             log=lambda message: None)
+        usernames = [u for (u,) in db.session.query(User.username).filter_by(role='student').order_by(User.id)]
+        if args.rehash_from:
+            # Hashes guardados con la política anterior: el primer inicio de sesión los migra
+            old_hash = generate_password_hash(PASSWORDS['student'], method=args.rehash_from)
+            db.session.query(User).filter_by(role='student').update({User.password_hash: old_hash})
+            db.session.commit()
+        engine = db.engine
+
+    report = run_logins(app, usernames, args.threads, args.duration)
+    if args.rehash_from:
+        with app.app_context():
+            report['migrated'] = db.session.query(User).filter(
+                User.role == 'student', User.password_hash.like(f'{method}$%')
+            ).count()
+    engine.dispose()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inicios de sesión por segundo según la política de hash')
+    parser.add_argument('--methods', nargs='+', default=METHODS,
+                        help="Políticas de werkzeug con costo explícito, p. ej. 'scrypt:32768:8:1'")
+    parser.add_argument('--users', type=int, default=200, help='Estudiantes que inician sesión')
+    parser.add_argument('--threads', type=int, default=8, help='Peticiones simultáneas')
+    parser.add_argument('--hash-workers', type=int, default=Config.PASSWORD_HASH_WORKERS,
+                        help='Hilos del pool de hash (PASSWORD_HASH_WORKERS)')
+    parser.add_argument('--duration', type=float, default=10, help='Segundos de carga por política')
+    parser.add_argument('--rehash-from', help='Guardar los hashes con esta política para medir la migración')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    for method in args.methods:
+        print(f"🔐 {method}: {args.threads} peticiones simultáneas, {args.hash_workers} hilos de hash, "
+              f"{args.users} usuarios, {args.duration:.0f} s")
+        report = run_method(method, args)
+        print(f"   inicios/s {report['logins_per_second']:>8}   p50 {report['p50_ms']} ms   "
+              f"p95 {report['p95_ms']} ms   ocupado (503) {report['busy']}   errores {report['errors']}")
+        if 'migrated' in report:
+            print(f"   usuarios migrados desde {args.rehash_from}: {report['migrated']}/{args.users}")
+
+
+if __name__ == '__main__':
+    main()
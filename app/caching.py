@@ -0,0 +1,254 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheBackend:
+    """Interfaz común de los backends de caché con contadores de uso"""
+
+    def __init__(self, max_entries=1024, default_ttl=60):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    def delete(self, *keys):
+        raise NotImplementedError
+
+    def delete_prefix(self, prefix):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self).__name__,
+            'entries': len(self),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
+
+
+class NullCache(CacheBackend):
+    """No guarda nada: útil para pruebas y para desactivar la caché"""
+
+    def get(self, key):
+        self.misses += 1
+        return None
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+    def delete_prefix(self, prefix):
+        pass
+
+    def clear(self):
+        pass
+
+    def __len__(self):
+        return 0
+
+
+class MemoryCache(CacheBackend):
+    """Caché LRU con TTL dentro del proceso, segura entre hilos"""
+
+    def __init__(self, max_entries=1024, default_ttl=60):
+        super().__init__(max_entries, default_ttl)
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteCache(CacheBackend):
+    """Caché LRU con TTL en un archivo SQLite compartido por varios procesos.
+
+    Los contadores de aciertos y fallos son locales a cada proceso; las
+    entradas y las invalidaciones se ven desde todos los workers.
+    """
+
+    def __init__(self, path, max_entries=1024, default_ttl=60):
+        super().__init__(max_entries, default_ttl)
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._connection().execute(
+            'CREATE TABLE IF NOT EXISTS cache ('
+            ' key TEXT PRIMARY KEY, value BLOB NOT NULL,'
+            ' expires_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+        )
+        self._connection().execute(
+            'CREATE INDEX IF NOT EXISTS ix_cache_accessed_at ON cache (accessed_at)'
+        )
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def get(self, key):
+        connection = self._connection()
+        row = connection.execute(
+            'SELECT value, expires_at FROM cache WHERE key = ?', (key,)
+        ).fetchone()
+        now = time.time()
+        if row is None:
+            self.misses += 1
+            return None
+        if row[1] < now:
+            connection.execute('DELETE FROM cache WHERE key = ?', (key,))
+            self.expirations += 1
+            self.misses += 1
+            return None
+        connection.execute('UPDATE cache SET accessed_at = ? WHERE key = ?', (now, key))
+        self.hits += 1
+        return pickle.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        now = time.time()
+        connection = self._connection()
+        connection.execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)',
+            (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), now + ttl, now)
+        )
+        overflow = len(self) - self.max_entries
+        if overflow > 0:
+            connection.execute(
+                'DELETE FROM cache WHERE key IN '
+                '(SELECT key FROM cache ORDER BY accessed_at LIMIT ?)', (overflow,)
+            )
+            self.evictions += overflow
+
+    def delete(self, *keys):
+        if keys:
+            self._connection().executemany('DELETE FROM cache WHERE key = ?', [(k,) for k in keys])
+
+    def delete_prefix(self, prefix):
+        escaped = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        self._connection().execute(
+            "DELETE FROM cache WHERE key LIKE ? ESCAPE '\\'", (escaped + '%',)
+        )
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache')
+
+    def __len__(self):
+        return self._connection().execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+
+
+class Cache:
+    """Extensión de Flask que elige el backend de caché según la configuración"""
+
+    def __init__(self, app=None):
+        self.backend = NullCache()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        kind = app.config.get('CACHE_BACKEND', 'memory')
+        max_entries = app.config.get('CACHE_MAX_ENTRIES', 1024)
+        default_ttl = app.config.get('CACHE_DEFAULT_TTL', 60)
+
+        if kind == 'memory':
+            self.backend = MemoryCache(max_entries, default_ttl)
+        elif kind == 'sqlite':
+            self.backend = SQLiteCache(app.config['CACHE_SQLITE_PATH'], max_entries, default_ttl)
+        elif kind == 'null':
+            self.backend = NullCache(max_entries, default_ttl)
+        else:
+            raise ValueError(f'CACHE_BACKEND desconocido: {kind}')
+        app.extensions['cache'] = self
+
+    def get_or_set(self, key, compute, ttl=None):
+        """Devuelve el valor guardado o lo calcula y lo guarda"""
+        value = self.backend.get(key)
+        if value is None:
+            value = compute()
+            self.backend.set(key, value, ttl)
+        return value
+
+    def get(self, key):
+        return self.backend.get(key)
+
+    def set(self, key, value, ttl=None):
+        self.backend.set(key, value, ttl)
+
+    def delete(self, *keys):
+        self.backend.delete(*keys)
+
+    def delete_prefix(self, prefix):
+        self.backend.delete_prefix(prefix)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        return self.backend.stats()
@@ -0,0 +1,87 @@
+import csv
+import io
+import json
+from app.models import Result, Activity, User
+from app import db
+
+# Columnas exportadas, en orden
+EXPORT_FIELDS = [
+    'result_id', 'student', 'activity_id', 'activity', 'subject', 'score',
+    'max_score', 'percentage', 'time_spent', 'attempts', 'completed_at'
+]
+
+# Filas leídas de la base de datos por cada lote del cursor
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'json': 'application/json'
+}
+
+
+def results_query(activity_id=None, teacher_id=None):
+    """Consulta de resultados a exportar, como tuplas planas y sin objetos ORM"""
+    query = db.session.query(
+        Result.id, User.username, Activity.id, Activity.title, Activity.subject,
+        Result.score, Result.max_score, Result.percentage, Result.time_spent,
+        Result.attempts, Result.completed_at
+    ).join(User, User.id == Result.student_id).join(Activity, Activity.id == Result.activity_id)
+
+    if activity_id is not None:
+        query = query.filter(Result.activity_id == activity_id)
+    if teacher_id is not None:
+        query = query.filter(Activity.teacher_id == teacher_id)
+    return query.order_by(Result.id)
+
+
+def iter_rows(query, batch_size=EXPORT_BATCH_SIZE):
+    """Recorre la consulta por lotes sin cargar todas las filas en memoria"""
+    for row in query.yield_per(batch_size):
+        values = list(row)
+        if values[-1] is not None:
+            values[-1] = values[-1].isoformat()
+        yield values
+
+
+def stream_csv(rows, batch_size=EXPORT_BATCH_SIZE):
+    """Genera el CSV en fragmentos de `batch_size` filas.
+
+    El encabezado sale en un fragmento propio antes de leer la primera fila,
+    así la descarga empieza aunque la consulta tarde.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def stream_json(rows, batch_size=EXPORT_BATCH_SIZE):
+    """Genera un arreglo JSON de objetos en fragmentos de `batch_size` filas"""
+    chunk = ['[']
+    for count, row in enumerate(rows):
+        if count:
+            chunk.append(',')
+        chunk.append(json.dumps(dict(zip(EXPORT_FIELDS, row)), ensure_ascii=False))
+        if (count + 1) % batch_size == 0:
+            yield ''.join(chunk)
+            chunk = []
+    chunk.append(']')
+    yield ''.join(chunk)
+
+
+def stream_results(query, fmt):
+    """Generador con el contenido de la exportación en el formato pedido"""
+    rows = iter_rows(query)
+    if fmt == 'csv':
+        return stream_csv(rows)
+    return stream_json(rows)
@@ -1,4 +1,5 @@
 from flask_wtf import FlaskForm
+from flask_wtf.file import FileField, FileRequired
 from wtforms import StringField, PasswordField, SelectField, TextAreaField, SubmitField, RadioField
 from wtforms.validators import DataRequired, Email, Length, EqualTo, ValidationError
 from app.models import User
@@ -51,4 +52,9 @@ class QuestionForm(FlaskForm):
                                validators=[DataRequired()])
     points = SelectField('Puntos', choices=[(1, '1'), (2, '2'), (3, '3'), (5, '5')], 
                         coerce=int, validators=[DataRequired()])
-    submit = SubmitField('Agregar Pregunta')
\ No newline at end of file
+    submit = SubmitField('Agregar Pregunta')
+
+
+class ImportQuestionsForm(FlaskForm):
+    file = FileField('Banco de Preguntas (CSV, JSON o JSON Lines)', validators=[FileRequired()])
+    submit = SubmitField('Importar Preguntas')
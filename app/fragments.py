@@ -0,0 +1,138 @@
+import glob
+import hashlib
+import json
+import os
+import tempfile
+from flask import render_template, current_app
+from markupsafe import Markup
+from sqlalchemy import update, func
+from app.models import Activity, Question
+from app.caching import MemoryCache
+from app.grading import CHOICES, exam_order
+from app import db
+
+EXAM_TEMPLATE = '_exam_body.html'
+
+
+def bump_activity_version(activity_id):
+    """Marca que cambiaron las preguntas de la actividad (no hace commit)"""
+    db.session.execute(update(Activity).where(Activity.id == activity_id).values(
+        version=func.coalesce(Activity.version, 0) + 1
+    ))
+
+
+def exam_page_header(activity_id):
+    """(versión, título) de la actividad con una consulta por clave primaria, o None si no existe"""
+    row = db.session.query(Activity.version, Activity.title).filter(Activity.id == activity_id).first()
+    return None if row is None else (row.version or 0, row.title)
+
+
+class ExamFragmentCache:
+    """Contenido de la página de examen preparado una vez por versión de actividad.
+
+    Las preguntas de una actividad solo cambian al agregarlas o importarlas, y
+    entonces sube Activity.version, así que el encabezado y las preguntas se
+    guardan con la clave (actividad, versión) y no hace falta invalidarlos.
+    Viven en una LRU en memoria de EXAM_FRAGMENT_CACHE_SIZE entradas y, si
+    EXAM_FRAGMENT_DIR está definido, también en disco (JSON) para que
+    sobrevivan a reinicios y se compartan entre procesos. Cada intento solo
+    los ordena según su semilla (grading.exam_order) y renderiza la
+    plantilla, sin consultas. La huella de la plantilla forma parte del ETag:
+    cambiarla invalida las páginas que tengan los navegadores.
+    """
+
+    def __init__(self):
+        self._fragments = MemoryCache(max_entries=256, default_ttl=86400)
+        self.directory = None
+        self.fingerprint = ''
+        self.builds = 0
+
+    def init_app(self, app):
+        self._fragments = MemoryCache(max_entries=app.config.get('EXAM_FRAGMENT_CACHE_SIZE', 256),
+                                      default_ttl=86400)
+        self.directory = app.config.get('EXAM_FRAGMENT_DIR')
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+        source, _, _ = app.jinja_env.loader.get_source(app.jinja_env, EXAM_TEMPLATE)
+        self.fingerprint = hashlib.sha1(source.encode('utf-8')).hexdigest()[:8]
+        app.extensions['exam_fragments'] = self
+
+    def etag(self, activity_id, version):
+        return f'exam-{activity_id}-v{version}-{self.fingerprint}'
+
+    def _path(self, activity_id, version):
+        return os.path.join(self.directory, f'{self.etag(activity_id, version)}.json')
+
+    def get(self, activity_id, version):
+        """Encabezado y preguntas del examen: memoria, luego disco, luego la base de datos"""
+        key = (activity_id, version)
+        exam = self._fragments.get(key)
+        if exam is not None:
+            return exam
+
+        path = self._path(activity_id, version) if self.directory else None
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                exam = json.load(f)
+        else:
+            exam = self._build(activity_id)
+            if path:
+                self._persist(activity_id, path, exam)
+        self._fragments.set(key, exam)
+        return exam
+
+    def _build(self, activity_id):
+        activity = db.session.get(Activity, activity_id)
+        questions = Question.query.filter_by(activity_id=activity_id).order_by(Question.id).all()
+        self.builds += 1
+        return {
+            'activity': {field: getattr(activity, field) for field in ('title', 'description', 'subject', 'difficulty')},
+            'questions': {
+                str(q.id): [q.question_text, q.points, [q.option_a, q.option_b, q.option_c, q.option_d]]
+                for q in questions
+            }
+        }
+
+    def render(self, activity_id, version, seed):
+        """HTML del examen con las preguntas y opciones en el orden del intento"""
+        exam = self.get(activity_id, version)
+        order, options = exam_order(seed, [int(question_id) for question_id in exam['questions']])
+        questions = []
+        for question_id in order:
+            text, points, choices = exam['questions'][str(question_id)]
+            questions.append({
+                'id': question_id, 'text': text, 'points': points,
+                'options': [(shown, choices[CHOICES.index(original)])
+                            for shown, original in zip(CHOICES, options[question_id])]
+            })
+        return Markup(render_template(EXAM_TEMPLATE, activity=exam['activity'], questions=questions))
+
+    def _persist(self, activity_id, path, exam):
+        """Guarda el examen en disco; si falla, solo queda en memoria"""
+        # Escritura atómica con un temporal único por llamada: varios hilos o
+        # procesos pueden preparar la misma versión a la vez
+        try:
+            descriptor, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            try:
+                with os.fdopen(descriptor, 'w', encoding='utf-8') as f:
+                    json.dump(exam, f)
+                os.replace(temporary, path)
+            except BaseException:
+                os.unlink(temporary)
+                raise
+        except OSError:
+            current_app.logger.exception('No se pudo guardar el examen %s en %s', activity_id, path)
+            return
+        # Limpieza de las versiones anteriores de la actividad
+        for old in glob.glob(os.path.join(self.directory, f'exam-{activity_id}-v*.json')):
+            if old != path:
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
+
+    def stats(self):
+        return dict(self._fragments.stats(), builds=self.builds, directory=self.directory)
+
+
+exam_fragments = ExamFragmentCache()
@@ -0,0 +1,106 @@
+import random
+import secrets
+from app.models import Activity, Question
+from app import db, cache
+
+# La clave lleva la versión de la actividad, que sube al cambiar las preguntas, así que
+# puede vivir mucho más que el resto de la caché; el TTL solo retira las versiones viejas
+ANSWER_KEY_TTL = 3600
+
+# Código de cada opción en el vector de respuestas de Result.answers (0 = sin responder)
+CHOICES = 'abcd'
+
+
+def new_exam_seed():
+    """Semilla del orden de preguntas y opciones de un intento"""
+    return secrets.randbits(32)
+
+
+def exam_order(seed, question_ids):
+    """Orden de un intento a partir de su semilla, en O(n) y sin consultas.
+
+    Devuelve (ids de pregunta en el orden mostrado, {id: opciones}) donde
+    opciones[i] es la opción original (de CHOICES) que se muestra en la
+    posición i. Con seed None se conserva el orden original. Las opciones se
+    barajan en el orden de question_ids, antes que las preguntas, así que
+    agregar preguntas (ids mayores) durante un intento no cambia las opciones
+    de las que el estudiante ya tiene en pantalla.
+    """
+    question_ids = sorted(question_ids)
+    if seed is None:
+        return question_ids, {question_id: CHOICES for question_id in question_ids}
+    rng = random.Random(seed)
+    options = {}
+    for question_id in question_ids:
+        shuffled = list(CHOICES)
+        rng.shuffle(shuffled)
+        options[question_id] = ''.join(shuffled)
+    order = list(question_ids)
+    rng.shuffle(order)
+    return order, options
+
+
+class AnswerKey:
+    """Respuestas correctas de una actividad compiladas para calificar sin consultas"""
+
+    def __init__(self, activity_id, answers):
+        self.activity_id = activity_id
+        self.answers = answers  # id de pregunta -> (respuesta correcta en minúscula, puntos)
+        self.max_score = sum(points for _, points in answers.values())
+
+    @property
+    def question_ids(self):
+        """Ids de las preguntas en el orden del vector de respuestas"""
+        return sorted(self.answers)
+
+    def grade(self, form, seed=None):
+        """Califica las respuestas enviadas (campos question_<id>).
+
+        Cada respuesta es la posición mostrada ('a'-'d'); con la semilla del
+        intento se traduce a la opción original. Devuelve (puntaje, vector de
+        respuestas empaquetado para Result.answers, siempre en opciones originales).
+        """
+        _, options = exam_order(seed, self.answers)
+        score = 0
+        packed = bytearray()
+        for question_id in self.question_ids:
+            correct, points = self.answers[question_id]
+            shown = (form.get(f'question_{question_id}') or '').lower()
+            position = CHOICES.find(shown) if len(shown) == 1 else -1
+            answer = options[question_id][position] if position >= 0 else ''
+            packed.append(CHOICES.index(answer) + 1 if answer else 0)
+            if answer and answer == correct:
+                score += points
+        return score, bytes(packed)
+
+    def __repr__(self):
+        return f'<AnswerKey actividad:{self.activity_id} preguntas:{len(self.answers)}>'
+
+
+def compile_answer_key(activity_id):
+    """Construye la clave con una sola consulta; None si la actividad no existe"""
+    rows = db.session.query(Activity.id, Question.id, Question.correct_answer, Question.points).outerjoin(
+        Question, Question.activity_id == Activity.id
+    ).filter(Activity.id == activity_id).all()
+    if not rows:
+        return None
+    return AnswerKey(activity_id, {
+        question_id: (correct_answer.lower(), points)
+        for _, question_id, correct_answer, points in rows if question_id is not None
+    })
+
+
+def answer_key(activity_id):
+    """Clave de respuestas de la actividad desde la caché compartida.
+
+    Se guarda por (actividad, Activity.version): agregar o importar preguntas
+    sube la versión, así que ningún proceso califica con una clave vieja
+    aunque no le llegue la invalidación (caché en memoria, importación por
+    CLI). Leer la versión es una consulta por clave primaria.
+    """
+    row = db.session.query(Activity.version).filter(Activity.id == activity_id).first()
+    if row is None:
+        return None
+    return cache.get_or_set(f'answer_key:{activity_id}:{row.version or 0}',
+                            lambda: compile_answer_key(activity_id), ttl=ANSWER_KEY_TTL)
+
@@ -0,0 +1,60 @@
+from flask_login import UserMixin
+from sqlalchemy import event
+from app.models import User
+from app.caching import MemoryCache
+from app import db
+
+
+class Identity(UserMixin):
+    """Usuario autenticado sin sesión de SQLAlchemy: solo id, nombre y rol"""
+
+    def __init__(self, id, username, role):
+        self.id = id
+        self.username = username
+        self.role = role
+
+    def __repr__(self):
+        return f'<Identity {self.username} ({self.role})>'
+
+
+class IdentityCache:
+    """Caché LRU con TTL de las identidades que carga el user_loader de Flask-Login.
+
+    Evita el SELECT de users en cada petición autenticada. Se invalida al
+    modificar o borrar un usuario (eventos de SQLAlchemy, así que cubre
+    delete_user y cualquier cambio de rol) en este proceso; en los demás
+    procesos el cambio se nota como mucho tras IDENTITY_CACHE_TTL segundos.
+    """
+
+    def __init__(self):
+        self._identities = MemoryCache(max_entries=4096, default_ttl=60)
+
+    def init_app(self, app):
+        self._identities = MemoryCache(max_entries=app.config.get('IDENTITY_CACHE_SIZE', 4096),
+                                       default_ttl=app.config.get('IDENTITY_CACHE_TTL', 60))
+        app.extensions['identity_cache'] = self
+
+    def load(self, user_id):
+        values = self._identities.get(user_id)
+        if values is None:
+            user = db.session.get(User, user_id)
+            if user is None:
+                return None
+            values = (user.id, user.username, user.role)
+            self._identities.set(user_id, values)
+        return Identity(*values)
+
+    def invalidate(self, user_id):
+        self._identities.delete(user_id)
+
+    def stats(self):
+        return self._identities.stats()
+
+
+identity_cache = IdentityCache()
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_identity(mapper, connection, target):
+    identity_cache.invalidate(target.id)
@@ -0,0 +1,41 @@
+import sys
+import argparse
+from pathlib import Path
+
+# Permite ejecutar el script directamente (python app/import_questions.py).
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from app import create_app, db, cache
+from app.models import Activity
+from app.importer import import_questions_file
+from app.logic import activity_cache_keys
+from app.jobs import job_runner
+
+parser = argparse.ArgumentParser(description='Importa un banco de preguntas (CSV, JSON o JSON Lines) a una actividad')
+parser.add_argument('activity_id', type=int, help='Id de la actividad')
+parser.add_argument('path', help='Archivo .csv, .json o .jsonl')
+args = parser.parse_args()
+
+app = create_app()
+
+with app.app_context():
+    activity = db.session.get(Activity, args.activity_id)
+    if activity is None:
+        print(f"❌ No existe la actividad {args.activity_id}")
+        sys.exit(1)
+
+    print(f"📥 Importando preguntas en: {activity.title}")
+    report = import_questions_file(activity.id, args.path)
+    if report.inserted:
+        # import_questions ya subió Activity.version (clave de respuestas y página de
+        # examen); las demás claves solo se invalidan en la caché que ve este proceso
+        keys = activity_cache_keys(activity)
+        cache.delete(*keys)
+        job_runner.refresh(keys)
+
+    for number, error in report.errors:
+        print(f"   ❌ Fila {number}: {error}")
+    print(f"✅ {report.inserted} preguntas importadas en {report.seconds:.2f} s "
+          f"({report.rows_per_second} filas/s)")
@@ -0,0 +1,222 @@
+import csv
+import json
+import os
+import time
+from app.models import Question
+from app import db
+from app.fragments import bump_activity_version
+
+QUESTION_FIELDS = ['question_text', 'option_a', 'option_b', 'option_c', 'option_d',
+                   'correct_answer', 'points']
+OPTION_MAX_LENGTH = 200
+VALID_ANSWERS = {'a', 'b', 'c', 'd'}
+
+# Filas por cada executemany
+IMPORT_BATCH_SIZE = 500
+# Caracteres leídos por bloque al recorrer un arreglo JSON
+JSON_CHUNK_SIZE = 64 * 1024
+
+
+class ImportReport:
+    """Resultado de una importación: filas insertadas, errores por fila y rendimiento"""
+
+    def __init__(self):
+        self.inserted = 0
+        self.errors = []  # (número de fila, mensaje)
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self):
+        return round(self.inserted / self.seconds, 1) if self.seconds else 0
+
+    def __repr__(self):
+        return (f'<ImportReport insertadas:{self.inserted} errores:{len(self.errors)} '
+                f'filas/s:{self.rows_per_second}>')
+
+
+class InvalidRow:
+    """Fila que el lector no pudo decodificar; validate_row la informa como error"""
+
+    def __init__(self, message):
+        self.message = message
+
+
+def allowed_file(filename, allowed_extensions):
+    """Comprueba la extensión contra ALLOWED_EXTENSIONS"""
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in allowed_extensions
+
+
+def read_csv(stream):
+    """Recorre un CSV con encabezados; devuelve (número de fila, dict)"""
+    reader = csv.DictReader(stream)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def _refill(stream, buffer, position, chunk_size):
+    """Descarta lo ya leído del buffer y agrega el siguiente bloque; (buffer, fin del archivo)"""
+    chunk = stream.read(chunk_size)
+    return buffer[position:] + chunk, not chunk
+
+
+def iter_json_array(stream, chunk_size=JSON_CHUNK_SIZE, prefix=''):
+    """Elementos de un arreglo JSON leyendo el archivo por bloques de chunk_size.
+
+    En memoria solo queda el bloque actual y el elemento que se está
+    decodificando, no el archivo completo. `prefix` es texto ya leído del
+    principio del archivo.
+    """
+    decoder = json.JSONDecoder()
+    buffer, eof = _refill(stream, prefix, 0, chunk_size)
+    position = 0
+    opened = False
+    while True:
+        # Saltar espacios y, dentro del arreglo, las comas entre elementos
+        separators = ' \t\r\n,' if opened else ' \t\r\n'
+        while position < len(buffer) and buffer[position] in separators:
+            position += 1
+        if position == len(buffer):
+            if eof:
+                raise ValueError('El JSON debe ser una lista de preguntas' if not opened else
+                                 'el arreglo JSON está incompleto')
+            buffer, eof = _refill(stream, buffer, position, chunk_size)
+            position = 0
+            continue
+        if not opened:
+            if buffer[position] != '[':
+                raise ValueError('El JSON debe ser una lista de preguntas')
+            opened = True
+            position += 1
+            continue
+        if buffer[position] == ']':
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            item, end = None, None
+        # Un elemento que llega justo al final del bloque puede seguir en el siguiente
+        if end is None or (end == len(buffer) and not eof):
+            buffer, eof = _refill(stream, buffer, position, chunk_size)
+            position = 0
+            continue
+        yield item
+        position = end
+
+
+def read_json(stream):
+    """Recorre un arreglo JSON de preguntas, o un objeto {"questions": [...]}.
+
+    El arreglo se lee por bloques; el formato de objeto se carga completo.
+    """
+    first = stream.read(1)
+    while first.isspace():
+        first = stream.read(1)
+    if first == '{':
+        data = json.loads(first + stream.read())
+        questions = data.get('questions', [])
+        if not isinstance(questions, list):
+            raise ValueError('El JSON debe ser una lista de preguntas')
+        yield from enumerate(questions, 1)
+        return
+    yield from enumerate(iter_json_array(stream, prefix=first), 1)
+
+
+def read_jsonl(stream):
+    """Recorre un archivo JSON Lines: una pregunta por línea, leída de a una.
+
+    Una línea que no es JSON válido se devuelve como InvalidRow y la
+    importación sigue con las demás.
+    """
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as error:
+            row = InvalidRow(f'JSON inválido: {error.msg} (columna {error.colno})')
+        yield number, row
+
+
+READERS = {'csv': read_csv, 'json': read_json, 'jsonl': read_jsonl}
+
+
+def validate_row(row):
+    """Devuelve (valores listos para insertar, None) o (None, mensaje de error)"""
+    if isinstance(row, InvalidRow):
+        return None, row.message
+    if not isinstance(row, dict):
+        return None, 'la fila no es un objeto'
+
+    values = {}
+    for field in QUESTION_FIELDS[:5]:
+        value = str(row.get(field) or '').strip()
+        if not value:
+            return None, f'falta {field}'
+        if field != 'question_text' and len(value) > OPTION_MAX_LENGTH:
+            return None, f'{field} supera {OPTION_MAX_LENGTH} caracteres'
+        values[field] = value
+
+    answer = str(row.get('correct_answer') or '').strip().lower()
+    if answer not in VALID_ANSWERS:
+        return None, 'correct_answer debe ser a, b, c o d'
+    values['correct_answer'] = answer
+
+    try:
+        points = int(row.get('points') or 1)
+    except (TypeError, ValueError):
+        return None, 'points debe ser un número entero'
+    if points <= 0:
+        return None, 'points debe ser mayor que cero'
+    values['points'] = points
+
+    return values, None
+
+
+def import_questions(activity_id, stream, fmt, batch_size=IMPORT_BATCH_SIZE):
+    """Valida e inserta un banco de preguntas en una sola transacción.
+
+    Las filas válidas se insertan por lotes con executemany; las inválidas se
+    informan en el reporte con su número de fila. Si el archivo no se puede
+    leer no se inserta nada.
+    """
+    report = ImportReport()
+    start = time.perf_counter()
+    reader = READERS[fmt]
+
+    batch = []
+    try:
+        for number, row in reader(stream):
+            values, error = validate_row(row)
+            if error:
+                report.errors.append((number, error))
+                continue
+            values['activity_id'] = activity_id
+            batch.append(values)
+            if len(batch) >= batch_size:
+                db.session.execute(Question.__table__.insert(), batch)
+                report.inserted += len(batch)
+                batch = []
+        if batch:
+            db.session.execute(Question.__table__.insert(), batch)
+            report.inserted += len(batch)
+        if report.inserted:
+            bump_activity_version(activity_id)
+        db.session.commit()
+    except (ValueError, csv.Error, UnicodeDecodeError) as error:
+        db.session.rollback()
+        report.inserted = 0
+        report.errors.append((0, f'no se pudo leer el archivo: {error}'))
+
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+def import_questions_file(activity_id, path):
+    """Importa desde un archivo .csv, .json o .jsonl en disco"""
+    fmt = os.path.splitext(path)[1].lstrip('.').lower()
+    if fmt not in READERS:
+        raise ValueError('Formato no soportado, usa .csv, .json o .jsonl')
+    with open(path, encoding='utf-8-sig', newline='') as stream:
+        return import_questions(activity_id, stream, fmt)
@@ -8,6 +8,7 @@ if str(ROOT_DIR) not in sys.path:
 
 from app import create_app, db
 from app.models import User, Activity, Question, Result
+from app.stats import rebuild_stats
 
 app = create_app()
 
@@ -292,6 +293,7 @@ with app.app_context():
         db.session.add(result)
     
     db.session.commit()
+    rebuild_stats()
     print("✅ Resultados de prueba creados")
     
     print("\n" + "="*60)
@@ -0,0 +1,256 @@
+import json
+import os
+import threading
+import time
+import traceback
+from collections import deque
+from contextlib import contextmanager
+from flask import g, request, current_app, has_request_context, before_render_template, template_rendered
+from app import db
+from sqlalchemy import event
+
+
+class QueryCounter:
+    """Cuenta las sentencias SQL ejecutadas por el motor mientras está activo"""
+
+    def __init__(self, engine=None):
+        self.engine = engine
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        self.engine = self.engine or db.engine
+        self.statements = []
+        event.listen(self.engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._record)
+        return False
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+@contextmanager
+def assert_max_queries(limit, engine=None):
+    """Falla si el bloque ejecuta más de `limit` sentencias SQL.
+
+    Sirve para detectar regresiones N+1, por ejemplo:
+
+        with app.app_context(), assert_max_queries(8):
+            client.get('/teacher/dashboard')
+    """
+    with QueryCounter(engine) as counter:
+        yield counter
+    if counter.count > limit:
+        listing = '\n'.join(f'  {i + 1}. {sql}' for i, sql in enumerate(counter.statements))
+        raise AssertionError(
+            f'Se ejecutaron {counter.count} sentencias SQL (máximo {limit}):\n{listing}'
+        )
+
+
+# ==================== PERFILADO DE PETICIONES ====================
+
+HISTOGRAM_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _call_site():
+    """Primer marco de la aplicación (fuera de este módulo) que originó la consulta"""
+    for frame in reversed(traceback.extract_stack()[:-2]):
+        if frame.filename.startswith(APP_DIR) and not frame.filename.endswith('instrumentation.py'):
+            return f'{os.path.relpath(frame.filename, os.path.dirname(APP_DIR))}:{frame.lineno} en {frame.name}'
+    return None
+
+
+def _profile():
+    """Datos de perfilado de la petición actual, o None si no se está perfilando"""
+    if not has_request_context():
+        return None
+    return g.get('profile')
+
+
+class RollingMetrics:
+    """Ventanas móviles de duración por endpoint y últimas consultas lentas"""
+
+    def __init__(self, window=1000, slow_queries=50):
+        self.window = window
+        self._lock = threading.Lock()
+        self._requests = {}
+        self.slow_queries = deque(maxlen=slow_queries)
+
+    def record(self, endpoint, total_ms, sql_count, sql_ms):
+        with self._lock:
+            samples = self._requests.setdefault(endpoint, deque(maxlen=self.window))
+            samples.append((total_ms, sql_count, sql_ms))
+
+    def record_slow_query(self, entry):
+        with self._lock:
+            self.slow_queries.append(entry)
+
+    @staticmethod
+    def _percentile(values, fraction):
+        return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+    def snapshot(self):
+        with self._lock:
+            requests = {endpoint: list(samples) for endpoint, samples in self._requests.items()}
+            slow_queries = list(self.slow_queries)
+
+        endpoints = {}
+        for endpoint, samples in requests.items():
+            durations = sorted(sample[0] for sample in samples)
+            # Cubetas acumulativas al estilo Prometheus: peticiones con duración <= le
+            histogram = [{'le': bucket, 'count': sum(1 for d in durations if d <= bucket)}
+                         for bucket in HISTOGRAM_BUCKETS_MS]
+            histogram.append({'le': '+inf', 'count': len(durations)})
+            endpoints[endpoint] = {
+                'count': len(samples),
+                'p50_ms': round(self._percentile(durations, 0.5), 2),
+                'p95_ms': round(self._percentile(durations, 0.95), 2),
+                'max_ms': round(durations[-1], 2),
+                'avg_sql_statements': round(sum(s[1] for s in samples) / len(samples), 2),
+                'avg_sql_ms': round(sum(s[2] for s in samples) / len(samples), 2),
+                'histogram_ms': histogram
+            }
+        return {'window': self.window, 'endpoints': endpoints, 'slow_queries': slow_queries}
+
+
+class Profiler:
+    """Instrumentación opcional: SQL, LogicEngine y plantillas por petición.
+
+    Se activa con PROFILING_ENABLED. Expone los tiempos en la cabecera
+    Server-Timing, en una línea de log JSON por petición y en métricas
+    acumuladas para /admin/metrics.
+    """
+
+    def __init__(self):
+        self.metrics = RollingMetrics()
+        self.slow_query_ms = 100
+        self.enabled = False
+
+    def init_app(self, app):
+        self.enabled = app.config.get('PROFILING_ENABLED', False)
+        if not self.enabled:
+            return
+        self.slow_query_ms = app.config.get('SLOW_QUERY_THRESHOLD_MS', 100)
+        self.metrics = RollingMetrics(app.config.get('METRICS_WINDOW', 1000))
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.extensions['profiler'] = self
+
+    # --- SQL ---
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('profiler_start', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        start = conn.info['profiler_start'].pop()
+        profile = _profile()
+        if profile is None:
+            return
+        elapsed = (time.perf_counter() - start) * 1000
+        profile['sql_count'] += 1
+        profile['sql_ms'] += elapsed
+        if elapsed >= self.slow_query_ms:
+            entry = {
+                'endpoint': request.endpoint,
+                'duration_ms': round(elapsed, 2),
+                'statement': statement,
+                'parameters': repr(parameters)[:500],
+                'call_site': _call_site()
+            }
+            profile['slow_queries'] += 1
+            self.metrics.record_slow_query(entry)
+            current_app.logger.warning('Consulta lenta: %s', json.dumps(entry, ensure_ascii=False))
+
+    # --- Plantillas ---
+
+    def _before_render(self, sender, template, context, **extra):
+        profile = _profile()
+        if profile is not None:
+            profile['template_start'].append(time.perf_counter())
+
+    def _after_render(self, sender, template, context, **extra):
+        profile = _profile()
+        if profile is not None and profile['template_start']:
+            profile['template_ms'] += (time.perf_counter() - profile['template_start'].pop()) * 1000
+
+    # --- Petición ---
+
+    def _start_request(self):
+        g.profile = {
+            'start': time.perf_counter(),
+            'sql_count': 0,
+            'sql_ms': 0.0,
+            'logic_ms': 0.0,
+            'logic_calls': 0,
+            'logic_depth': 0,
+            'template_ms': 0.0,
+            'template_start': [],
+            'slow_queries': 0
+        }
+
+    def _finish_request(self, response):
+        profile = _profile()
+        if profile is None:
+            return response
+        total = (time.perf_counter() - profile['start']) * 1000
+
+        response.headers['Server-Timing'] = ', '.join([
+            f'db;dur={profile["sql_ms"]:.2f};desc="{profile["sql_count"]} consultas"',
+            f'logic;dur={profile["logic_ms"]:.2f};desc="{profile["logic_calls"]} llamadas"',
+            f'tpl;dur={profile["template_ms"]:.2f}',
+            f'total;dur={total:.2f}'
+        ])
+        current_app.logger.info(json.dumps({
+            'event': 'request',
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'total_ms': round(total, 2),
+            'sql_count': profile['sql_count'],
+            'sql_ms': round(profile['sql_ms'], 2),
+            'logic_ms': round(profile['logic_ms'], 2),
+            'logic_calls': profile['logic_calls'],
+            'template_ms': round(profile['template_ms'], 2),
+            'slow_queries': profile['slow_queries']
+        }, ensure_ascii=False))
+        self.metrics.record(request.endpoint or request.path, total,
+                            profile['sql_count'], profile['sql_ms'])
+        return response
+
+
+profiler = Profiler()
+
+
+def timed_logic_call(f, *args, **kwargs):
+    """Ejecuta una llamada de LogicEngine sumando su tiempo al perfil de la petición.
+
+    Solo cuenta las llamadas de primer nivel para no sumar dos veces las anidadas.
+    """
+    profile = _profile()
+    if profile is None:
+        return f(*args, **kwargs)
+
+    profile['logic_depth'] += 1
+    start = time.perf_counter()
+    try:
+        return f(*args, **kwargs)
+    finally:
+        profile['logic_depth'] -= 1
+        if profile['logic_depth'] == 0:
+            profile['logic_ms'] += (time.perf_counter() - start) * 1000
+            profile['logic_calls'] += 1
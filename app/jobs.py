@@ -0,0 +1,283 @@
+import atexit
+import json
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from app.models import User, Job, Snapshot, ActivityStats
+from flask import current_app
+from app.logic import LogicEngine
+from app.attempts import expire_stale_attempts
+from app import db
+from sqlalchemy import update, delete
+
+# Funciones que puede ejecutar el runner, registradas con @job
+JOB_HANDLERS = {}
+
+# Prefijo de clave de caché/snapshot -> tarea que la recalcula
+SNAPSHOT_JOBS = {
+    'teacher_overview': 'teacher_snapshot',
+    'activity_stats': 'activity_snapshot'
+}
+
+
+def job(name):
+    def decorator(f):
+        JOB_HANDLERS[name] = f
+        return f
+    return decorator
+
+
+def _dump_args(args):
+    return json.dumps(args, sort_keys=True)
+
+
+def save_snapshot(key, data):
+    db.session.merge(Snapshot(key=key, data=data, computed_at=datetime.utcnow()))
+    db.session.commit()
+
+
+def describe_age(computed_at, now=None):
+    """Antigüedad legible de un snapshot: 'hace 3 min'"""
+    seconds = ((now or datetime.utcnow()) - computed_at).total_seconds()
+    if seconds < 60:
+        return 'hace unos segundos'
+    if seconds < 3600:
+        return f'hace {int(seconds // 60)} min'
+    if seconds < 86400:
+        return f'hace {int(seconds // 3600)} h'
+    return f'hace {int(seconds // 86400)} días'
+
+
+# ==================== TAREAS ====================
+
+@job('teacher_snapshot')
+def teacher_snapshot(teacher_id):
+    """Resumen del docente y alertas de estudiantes con bajo rendimiento"""
+    roster = LogicEngine.get_teacher_roster(teacher_id)
+    struggling = LogicEngine.detect_struggling_students(teacher_id, roster=roster)
+    overview = LogicEngine.get_teacher_overview(teacher_id, struggling=struggling)
+    save_snapshot(f'teacher_overview:{teacher_id}', {
+        'overview': overview,
+        'struggling': [{
+            'student': {'id': item['student'].id, 'username': item['student'].username},
+            'average': item['average'],
+            'status': item['status']
+        } for item in struggling]
+    })
+
+
+@job('activity_snapshot')
+def activity_snapshot(activity_id):
+    """Estadísticas de una actividad"""
+    save_snapshot(f'activity_stats:{activity_id}', LogicEngine.get_activity_stats(activity_id))
+
+
+@job('expire_attempts')
+def expire_attempts():
+    """Marca como vencidos los intentos abiertos hace más de ATTEMPT_MAX_AGE"""
+    config = current_app.config
+    expire_stale_attempts(config.get('ATTEMPT_MAX_AGE', 3 * 3600), config.get('ATTEMPT_SWEEP_BATCH', 500))
+
+
+# ==================== RUNNER ====================
+
+class JobRunner:
+    """Ejecuta tareas pesadas en un pool de hilos usando la tabla jobs como cola.
+
+    Se activa con JOBS_ENABLED. Un hilo despachador reclama tareas pendientes
+    cada JOB_POLL_INTERVAL segundos (el UPDATE condicional evita que dos
+    procesos ejecuten la misma) y cada JOB_SCHEDULE_INTERVAL segundos
+    programa el recálculo de todos los snapshots y devuelve a la cola las
+    tareas que llevan más de JOB_LEASE_TIMEOUT segundos en curso (su proceso
+    murió). Las vistas leen el último snapshot y muestran su antigüedad.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.app = None
+        self._executor = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self._atexit_registered = False
+
+    def init_app(self, app):
+        if self._thread is not None:
+            self.stop()
+        self.enabled = app.config.get('JOBS_ENABLED', False)
+        if not self.enabled:
+            return
+        self.app = app
+        self.workers = app.config.get('JOB_WORKERS', 2)
+        self.poll_interval = app.config.get('JOB_POLL_INTERVAL', 1.0)
+        self.schedule_interval = app.config.get('JOB_SCHEDULE_INTERVAL', 300)
+        self.retention = timedelta(seconds=app.config.get('JOB_RETENTION', 86400))
+        self.lease_timeout = timedelta(seconds=app.config.get('JOB_LEASE_TIMEOUT', 900))
+
+        # Los hilos arrancan con la primera petición: así no compiten con
+        # upgrade_schema y los scripts que solo crean la app no los lanzan
+        app.before_request(self.start)
+        app.extensions['jobs'] = self
+
+    def start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='job')
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._dispatch, name='job-dispatcher', daemon=True)
+            self._thread.start()
+        if not self._atexit_registered:
+            atexit.register(self.stop)
+            self._atexit_registered = True
+
+    # --- Encolar ---
+
+    def enqueue_many(self, name, args_list):
+        """Encola tareas omitiendo las que ya están pendientes con los mismos argumentos"""
+        if not self.enabled:
+            return 0
+        if name not in JOB_HANDLERS:
+            raise ValueError(f'Tarea desconocida: {name}')
+        pending = {args for (args,) in db.session.query(Job.args).filter_by(name=name, status='pending')}
+        rows = []
+        for args in args_list:
+            dumped = _dump_args(args)
+            if dumped not in pending:
+                pending.add(dumped)
+                rows.append({'name': name, 'args': dumped, 'status': 'pending', 'created_at': datetime.utcnow()})
+        if rows:
+            db.session.execute(Job.__table__.insert(), rows)
+            db.session.commit()
+        return len(rows)
+
+    def enqueue(self, name, **args):
+        return self.enqueue_many(name, [args])
+
+    def refresh(self, keys):
+        """Programa el recálculo de los snapshots afectados por claves de caché invalidadas"""
+        if not self.enabled:
+            return
+        by_job = {}
+        for key in keys:
+            prefix, _, ident = key.partition(':')
+            if prefix in SNAPSHOT_JOBS and ident:
+                argument = 'teacher_id' if prefix == 'teacher_overview' else 'activity_id'
+                by_job.setdefault(SNAPSHOT_JOBS[prefix], []).append({argument: int(ident)})
+        for name, args_list in by_job.items():
+            self.enqueue_many(name, args_list)
+
+    def schedule_all(self):
+        """Recalcula periódicamente todos los snapshots y borra tareas viejas"""
+        teachers = [{'teacher_id': i} for (i,) in db.session.query(User.id).filter_by(role='teacher')]
+        activities = [{'activity_id': i} for (i,) in db.session.query(ActivityStats.activity_id)]
+        self.enqueue_many('teacher_snapshot', teachers)
+        self.enqueue_many('activity_snapshot', activities)
+        self.enqueue('expire_attempts')
+        db.session.execute(delete(Job).where(
+            Job.status.in_(['done', 'failed']), Job.finished_at < datetime.utcnow() - self.retention
+        ))
+        db.session.commit()
+
+    # --- Leer ---
+
+    def snapshot(self, key):
+        """Último snapshot guardado, o None si el runner está desactivado o aún no existe"""
+        if not self.enabled:
+            return None
+        return db.session.get(Snapshot, key)
+
+    def stats(self):
+        counts = dict(db.session.query(Job.status, db.func.count(Job.id)).group_by(Job.status).all())
+        return {'enabled': self.enabled, 'inflight': self._inflight, 'jobs': counts}
+
+    # --- Despacho y ejecución ---
+
+    def requeue_abandoned(self):
+        """Devuelve a la cola las tareas 'running' cuyo proceso murió a mitad.
+
+        Solo las que empezaron hace más de JOB_LEASE_TIMEOUT: las de otros
+        procesos vivos siguen en curso y no deben ejecutarse dos veces.
+        """
+        requeued = db.session.execute(update(Job).where(
+            Job.status == 'running', Job.started_at < datetime.utcnow() - self.lease_timeout
+        ).values(status='pending')).rowcount
+        db.session.commit()
+        if requeued:
+            self.app.logger.warning('%d tareas abandonadas vuelven a la cola', requeued)
+        return requeued
+
+    def _dispatch(self):
+        next_schedule = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    if time.monotonic() >= next_schedule:
+                        self.requeue_abandoned()
+                        self.schedule_all()
+                        next_schedule = time.monotonic() + self.schedule_interval
+                    claimed = self._claim()
+            except Exception:
+                self.app.logger.exception('Error en el despachador de tareas')
+                claimed = []
+            for job_id, name, args in claimed:
+                self._executor.submit(self._execute, job_id, name, args)
+            if not claimed:
+                self._stop.wait(self.poll_interval)
+
+    def _claim(self):
+        """Marca como 'running' tantas tareas pendientes como hilos libres haya"""
+        with self._lock:
+            free = self.workers - self._inflight
+        if free <= 0:
+            return []
+        candidates = db.session.query(Job.id, Job.name, Job.args).filter_by(status='pending').order_by(
+            Job.created_at, Job.id
+        ).limit(free).all()
+        claimed = []
+        for job_id, name, args in candidates:
+            updated = db.session.execute(update(Job).where(Job.id == job_id, Job.status == 'pending').values(
+                status='running', started_at=datetime.utcnow()
+            )).rowcount
+            if updated:
+                claimed.append((job_id, name, json.loads(args)))
+        db.session.commit()
+        with self._lock:
+            self._inflight += len(claimed)
+        return claimed
+
+    def _execute(self, job_id, name, args):
+        try:
+            with self.app.app_context():
+                try:
+                    JOB_HANDLERS[name](**args)
+                    status, error = 'done', None
+                except Exception:
+                    db.session.rollback()
+                    status, error = 'failed', traceback.format_exc()
+                    self.app.logger.exception('Falló la tarea %s %s', name, args)
+                db.session.execute(update(Job).where(Job.id == job_id).values(
+                    status=status, error=error, finished_at=datetime.utcnow()
+                ))
+                db.session.commit()
+        finally:
+            with self._lock:
+                self._inflight -= 1
+
+    def stop(self):
+        """Detiene el despachador y espera a las tareas en curso"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self._executor.shutdown(wait=True)
+        self._executor = None
+
+
+job_runner = JobRunner()
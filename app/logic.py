@@ -1,22 +1,152 @@
-from app.models import Result, Activity, User
-from app import db
+from app.models import Result, Activity, User, StudentFeatures
+from app import db, queries, cache, analytics, recommender
+from app.instrumentation import timed_logic_call
+from app.grading import CHOICES
+from flask import g, has_request_context, current_app
 from sqlalchemy import func
+from functools import wraps
+
+# Tendencia (puntos por intento) a partir de la cual se avisa de una caída
+TREND_ALERT = 5
+# Segundos por punto por encima de los cuales se sugiere gestionar el tiempo
+SLOW_SECONDS_PER_POINT = 60
+
+
+def _request_cache():
+    """Caché de la petición actual guardada en flask.g"""
+    if 'logic_cache_hits' not in g:
+        g.logic_cache_hits = 0
+        g.logic_cache_misses = 0
+    if 'logic_cache' not in g:
+        g.logic_cache = {}
+    return g.logic_cache
+
+
+def request_cached(f):
+    """Memoiza una llamada de LogicEngine por (método, argumentos) durante la petición.
+    
+    Fuera de una petición (scripts, benchmarks) la función se ejecuta siempre.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not has_request_context():
+            return f(*args, **kwargs)
+        
+        key = (f.__name__, args, tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return timed_logic_call(f, *args, **kwargs)
+        
+        cache = _request_cache()
+        if key in cache:
+            g.logic_cache_hits += 1
+            return cache[key]
+        
+        g.logic_cache_misses += 1
+        cache[key] = timed_logic_call(f, *args, **kwargs)
+        return cache[key]
+    return decorated_function
+
+
+def clear_request_cache():
+    """Descarta lo memoizado en la petición (después de escribir resultados)"""
+    if has_request_context():
+        g.pop('logic_cache', None)
+
+
+def request_cache_stats():
+    """Aciertos y fallos de la caché de la petición actual"""
+    if not has_request_context() or 'logic_cache_hits' not in g:
+        return {'hits': 0, 'misses': 0}
+    return {'hits': g.logic_cache_hits, 'misses': g.logic_cache_misses}
+
+
+def log_request_cache_stats(response):
+    """after_request: registra los contadores de la caché si hubo llamadas"""
+    stats = request_cache_stats()
+    if stats['hits'] or stats['misses']:
+        current_app.logger.debug('LogicEngine cache: %d aciertos, %d fallos',
+                                 stats['hits'], stats['misses'])
+    return response
+
+
+def shared_cached(prefix):
+    """Guarda el resultado en la caché compartida entre peticiones bajo `prefix:<args>`.
+    
+    Los argumentos por nombre no forman parte de la clave: solo sirven para
+    reutilizar datos ya calculados y no cambian el resultado. Las claves se
+    invalidan explícitamente cuando cambian los datos (ver *_cache_keys).
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            key = ':'.join([prefix] + [str(arg) for arg in args])
+            return cache.get_or_set(key, lambda: f(*args, **kwargs))
+        return decorated_function
+    return decorator
+
+
+def result_cache_keys(result):
+    """Claves afectadas por un nuevo resultado: la actividad y los docentes del estudiante
+    
+    El promedio general del estudiante cambia, así que cambian las alertas de todos
+    los docentes cuyas actividades ha resuelto.
+    """
+    teacher_ids = db.session.query(Activity.teacher_id).join(
+        Result, Result.activity_id == Activity.id
+    ).filter(Result.student_id == result.student_id).distinct()
+    keys = [f'activity_stats:{result.activity_id}', f'question_analysis:{result.activity_id}']
+    for (teacher_id,) in teacher_ids:
+        keys += [f'teacher_overview:{teacher_id}', f'cohort_analytics:{teacher_id}']
+    return keys
+
+
+def activity_cache_keys(activity):
+    """Claves afectadas al crear o modificar una actividad o sus preguntas"""
+    return [
+        f'activity_stats:{activity.id}',
+        f'question_analysis:{activity.id}',
+        f'teacher_overview:{activity.teacher_id}',
+        'activity_catalog',
+        'platform_counts'
+    ]
+
+
+def user_cache_keys(user):
+    """Claves afectadas al crear o eliminar un usuario (calcular antes de borrarlo)"""
+    keys = ['platform_counts']
+    if user.role == 'teacher':
+        keys += [f'teacher_overview:{user.id}', f'cohort_analytics:{user.id}']
+    elif user.role == 'student':
+        teacher_ids = db.session.query(Activity.teacher_id).join(
+            Result, Result.activity_id == Activity.id
+        ).filter(Result.student_id == user.id).distinct()
+        for (teacher_id,) in teacher_ids:
+            keys += [f'teacher_overview:{teacher_id}', f'cohort_analytics:{teacher_id}']
+    return keys
+
 
 class LogicEngine:
     """Motor de lógica para recomendaciones y análisis"""
     
     @staticmethod
+    @request_cached
     def calculate_student_average(student_id):
         """Calcula el promedio general del estudiante"""
-        results = Result.query.filter_by(student_id=student_id).all()
-        if not results:
-            return 0
-        return sum(r.percentage for r in results) / len(results)
+        return queries.student_average(student_id)
     
     @staticmethod
+    @request_cached
     def get_student_performance_level(student_id):
         """Determina el nivel de rendimiento del estudiante"""
-        avg = LogicEngine.calculate_student_average(student_id)
+        return LogicEngine.performance_level_for(
+            LogicEngine.calculate_student_average(student_id)
+        )
+    
+    @staticmethod
+    def performance_level_for(avg):
+        """Traduce un promedio a su nivel de rendimiento"""
         if avg >= 80:
             return 'excelente'
         elif avg >= 60:
@@ -27,14 +157,21 @@ class LogicEngine:
             return 'bajo'
     
     @staticmethod
+    @request_cached
+    def get_student_features(student_id):
+        """Vector de características del estudiante (None si aún no tiene resultados)"""
+        return db.session.get(StudentFeatures, student_id)
+    
+    @staticmethod
+    @request_cached
     def get_recommendations(student_id):
-        """Genera recomendaciones basadas en el rendimiento"""
-        results = Result.query.filter_by(student_id=student_id).order_by(Result.completed_at.desc()).limit(5).all()
+        """Genera recomendaciones a partir del vector de características del estudiante"""
+        features = LogicEngine.get_student_features(student_id)
         
-        if not results:
+        if features is None or not features.attempts:
             return ["Completa tu primera actividad para recibir recomendaciones personalizadas"]
         
-        avg = sum(r.percentage for r in results) / len(results)
+        avg = features.ewma_score
         recommendations = []
         
         # Lógica de recomendaciones
@@ -49,101 +186,185 @@ class LogicEngine:
             recommendations.append("🌟 ¡Excelente trabajo! Sigue así.")
             recommendations.append("🚀 Prueba con actividades de mayor dificultad.")
         
+        if features.trend <= -TREND_ALERT:
+            recommendations.append("📉 Tus últimos resultados van a la baja. Repasa antes de avanzar.")
+        
+        # Materia más débil, si está por debajo del aprobado
+        if features.subject_scores:
+            subject, score = min(features.subject_scores.items(), key=lambda item: item[1])
+            if score < queries.PASSING_PERCENTAGE:
+                recommendations.append(f"📖 Refuerza {subject}: es tu materia con menor puntaje reciente.")
+        
         # Analizar tiempo de respuesta
-        avg_time = sum(r.time_spent for r in results if r.time_spent) / len([r for r in results if r.time_spent]) if any(r.time_spent for r in results) else 0
-        if avg_time > 600:  # Más de 10 minutos
+        if features.time_per_point and features.time_per_point > SLOW_SECONDS_PER_POINT:
             recommendations.append("⏱️ Intenta gestionar mejor tu tiempo en las actividades.")
         
         return recommendations
     
     @staticmethod
+    @request_cached
     def adjust_difficulty(student_id):
-        """Ajusta la dificultad recomendada según últimos intentos"""
-        recent_results = Result.query.filter_by(student_id=student_id).order_by(Result.completed_at.desc()).limit(3).all()
-        
-        if not recent_results:
-            return 'easy'
-        
-        avg = sum(r.percentage for r in recent_results) / len(recent_results)
-        
-        if avg >= 85:
-            return 'hard'
-        elif avg >= 60:
-            return 'medium'
-        else:
-            return 'easy'
+        """Dificultad en la que el porcentaje esperado del estudiante es un reto adecuado"""
+        return recommender.suggested_difficulty(LogicEngine.get_student_features(student_id))
     
     @staticmethod
-    def detect_struggling_students(teacher_id):
-        """Detecta estudiantes con bajo rendimiento"""
-        activities = Activity.query.filter_by(teacher_id=teacher_id).all()
-        activity_ids = [a.id for a in activities]
-        
-        struggling = []
-        
-        # Obtener todos los estudiantes que han hecho actividades de este docente
-        students = db.session.query(User).join(Result).filter(
-            Result.activity_id.in_(activity_ids),
-            User.role == 'student'
-        ).distinct().all()
+    @request_cached
+    @shared_cached('activity_catalog')
+    def get_activity_catalog():
+        """Pares (materia, dificultad) con actividades activas"""
+        return queries.activity_catalog()
+    
+    @staticmethod
+    @request_cached
+    def get_activity_recommendations(student_id, limit=recommender.RECOMMENDATION_LIMIT):
+        """Actividades no resueltas que mejor se ajustan al nivel del estudiante"""
+        return [{
+            'activity': activity,
+            'expected': round(expected, 1)
+        } for activity, expected in recommender.rank_activities(
+            student_id, LogicEngine.get_activity_catalog(), limit
+        )]
+    
+    @staticmethod
+    @request_cached
+    def get_teacher_roster(teacher_id):
+        """Promedio, actividades completadas y rendimiento de cada estudiante del docente"""
+        return [{
+            'student': student,
+            'average': round(avg, 2),
+            'total_activities': completed,
+            'performance': LogicEngine.performance_level_for(avg),
+            'needs_support': avg < queries.PASSING_PERCENTAGE
+        } for student, avg, completed in queries.teacher_roster(teacher_id)]
+    
+    @staticmethod
+    @request_cached
+    def detect_struggling_students(teacher_id, roster=None):
+        """Detecta estudiantes con bajo rendimiento
         
-        for student in students:
-            avg = LogicEngine.calculate_student_average(student.id)
-            if avg < 60:
-                struggling.append({
-                    'student': student,
-                    'average': round(avg, 2),
-                    'status': 'Necesita apoyo'
-                })
+        Si se recibe el roster ya calculado se filtra en memoria sin consultar la base de datos.
+        """
+        if roster is not None:
+            return [{
+                'student': item['student'],
+                'average': item['average'],
+                'status': 'Necesita apoyo'
+            } for item in roster if item['needs_support']]
         
-        return struggling
+        return [{
+            'student': student,
+            'average': round(avg, 2),
+            'status': 'Necesita apoyo'
+        } for student, avg in queries.struggling_students(teacher_id)]
     
     @staticmethod
+    @request_cached
+    @shared_cached('activity_stats')
     def get_activity_stats(activity_id):
         """Obtiene estadísticas de una actividad"""
-        results = Result.query.filter_by(activity_id=activity_id).all()
+        summary = queries.activity_summary(activity_id)
+        total = summary['total']
         
-        if not results:
+        if total == 0:
             return {
                 'total_attempts': 0,
                 'average_score': 0,
                 'pass_rate': 0,
-                'avg_time': 0
+                'avg_time': 0,
+                'distribution': None
             }
         
-        total = len(results)
-        passed = len([r for r in results if r.percentage >= 60])
-        
         return {
             'total_attempts': total,
-            'average_score': round(sum(r.percentage for r in results) / total, 2),
-            'pass_rate': round((passed / total) * 100, 2),
-            'avg_time': round(sum(r.time_spent for r in results if r.time_spent) / len([r for r in results if r.time_spent]), 2) if any(r.time_spent for r in results) else 0
+            'average_score': round(summary['average'], 2),
+            'pass_rate': round((summary['passed'] / total) * 100, 2),
+            'avg_time': round(summary['avg_time'], 2),
+            # Desviación, percentiles e histograma (vectorizados con NumPy si está instalado)
+            'distribution': analytics.activity_distribution(activity_id)
         }
     
     @staticmethod
-    def get_teacher_overview(teacher_id):
-        """Resumen general para el docente"""
-        activities = Activity.query.filter_by(teacher_id=teacher_id).all()
+    @request_cached
+    @shared_cached('question_analysis')
+    def get_question_analysis(activity_id):
+        """Elecciones, porcentaje de acierto y discriminación de cada pregunta de una actividad"""
+        rows = queries.question_stats(activity_id)
+        question_ids = [question.id for question, _ in rows]
+        discrimination = analytics.question_discrimination(activity_id, question_ids, [
+            CHOICES.find(question.correct_answer.lower()) + 1 for question, _ in rows
+        ])
+        
+        return [{
+            'question_id': question.id,
+            'number': number,
+            'text': question.question_text,
+            'correct_answer': question.correct_answer.lower(),
+            'attempts': stats.attempts if stats else 0,
+            'blank': stats.blank if stats else 0,
+            'choices': {choice: getattr(stats, f'count_{choice}') if stats else 0 for choice in CHOICES},
+            'percent_correct': round(stats.percent_correct, 2) if stats else None,
+            'discrimination': discrimination[question.id]
+        } for number, (question, stats) in enumerate(rows, start=1)]
+    
+    @staticmethod
+    @request_cached
+    def get_failing_questions(teacher_id, limit=5):
+        """Preguntas del docente con menor porcentaje de acierto (lectura indexada de question_stats)"""
+        return [{
+            'question_id': question.id,
+            'activity_id': question.activity_id,
+            'activity_title': title,
+            'text': question.question_text,
+            'attempts': stats.attempts,
+            'percent_correct': round(stats.percent_correct, 2)
+        } for question, stats, title in queries.failing_questions(teacher_id, limit)]
+    
+    @staticmethod
+    @request_cached
+    @shared_cached('cohort_analytics')
+    def get_cohort_analytics(teacher_id):
+        """Distribución de resultados del docente y dificultad/discriminación de sus actividades"""
+        return analytics.cohort_analytics(teacher_id)
+    
+    @staticmethod
+    @request_cached
+    @shared_cached('teacher_overview')
+    def get_teacher_overview(teacher_id, struggling=None):
+        """Resumen general para el docente
         
-        total_activities = len(activities)
-        total_results = sum(len(a.results) for a in activities)
+        `struggling` permite reutilizar las alertas ya calculadas en la misma petición.
+        """
+        summary = queries.teacher_summary(teacher_id)
         
-        if total_results == 0:
+        if summary['total_results'] == 0:
             return {
-                'total_activities': total_activities,
+                'total_activities': summary['total_activities'],
                 'total_students': 0,
                 'average_performance': 0,
                 'alerts': 0
             }
         
-        all_percentages = [r.percentage for a in activities for r in a.results]
-        students = set(r.student_id for a in activities for r in a.results)
-        alerts = len(LogicEngine.detect_struggling_students(teacher_id))
+        if struggling is None:
+            struggling = LogicEngine.detect_struggling_students(teacher_id)
+        alerts = len(struggling)
         
         return {
-            'total_activities': total_activities,
-            'total_students': len(students),
-            'average_performance': round(sum(all_percentages) / len(all_percentages), 2),
+            'total_activities': summary['total_activities'],
+            'total_students': summary['total_students'],
+            'average_performance': round(summary['average'], 2),
             'alerts': alerts
-        }
\ No newline at end of file
+        }
+    
+    @staticmethod
+    @request_cached
+    @shared_cached('platform_counts')
+    def get_platform_counts():
+        """Totales de usuarios y actividades para el panel de administrador"""
+        counts = dict(db.session.query(User.role, func.count(User.id)).group_by(User.role).all())
+        
+        return {
+            'total_users': sum(counts.values()),
+            'total_students': counts.get('student', 0),
+            'total_teachers': counts.get('teacher', 0),
+            'total_activities': db.session.query(func.count(Activity.id)).scalar()
+        }
@@ -0,0 +1,36 @@
+import sys
+from pathlib import Path
+
+# Permite ejecutar el script directamente (python app/migrate_database.py).
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from app import create_app
+from app.schema import upgrade_schema, check_query_plans
+from app.stats import ensure_stats
+
+app = create_app()
+
+with app.app_context():
+    print("🔄 Actualizando estructura de la base de datos (sin borrar datos)...")
+    created = upgrade_schema()
+    ensure_stats()
+    if created:
+        for name in created:
+            kind = 'Columna agregada' if '.' in name else 'Índice creado'
+            print(f"   ➕ {kind}: {name}")
+    else:
+        print("   La base de datos ya tenía todas las columnas e índices")
+
+    print("🔍 Verificando planes de consulta...")
+    failed = False
+    for name, ok, plan in check_query_plans():
+        print(f"   {'✅' if ok else '❌'} {name}")
+        for line in plan:
+            print(f"      {line}")
+        failed = failed or not ok
+
+    if failed:
+        sys.exit(1)
+    print("✅ Migración completada")
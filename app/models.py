@@ -1,6 +1,7 @@
 from app import db, login_manager
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import check_password_hash
+from app.passwords import password_hasher
 from datetime import datetime
 
 class User(UserMixin, db.Model):
@@ -18,7 +19,7 @@ class User(UserMixin, db.Model):
     activities_created = db.relationship('Activity', backref='creator', lazy=True)
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
@@ -29,6 +30,11 @@ class User(UserMixin, db.Model):
 
 class Activity(db.Model):
     __tablename__ = 'activities'
+    __table_args__ = (
+        db.Index('ix_activities_teacher_id', 'teacher_id'),
+        # Candidatas a recomendar por materia y dificultad (ver app/recommender.py)
+        db.Index('ix_activities_subject_difficulty', 'subject', 'difficulty', 'is_active'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
@@ -38,6 +44,8 @@ class Activity(db.Model):
     teacher_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True)
+    # Sube cada vez que cambian las preguntas; identifica la página de examen cacheada
+    version = db.Column(db.Integer, default=1)
     
     # Relaciones
     questions = db.relationship('Question', backref='activity', lazy=True, cascade='all, delete-orphan')
@@ -49,6 +57,9 @@ class Activity(db.Model):
 
 class Question(db.Model):
     __tablename__ = 'questions'
+    __table_args__ = (
+        db.Index('ix_questions_activity_id', 'activity_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     activity_id = db.Column(db.Integer, db.ForeignKey('activities.id'), nullable=False)
@@ -66,6 +77,16 @@ class Question(db.Model):
 
 class Result(db.Model):
     __tablename__ = 'results'
+    __table_args__ = (
+        # Últimos resultados de un estudiante
+        db.Index('ix_results_student_completed', 'student_id', 'completed_at'),
+        # Estudiantes distintos por actividad (roster y alertas del docente)
+        db.Index('ix_results_activity_student', 'activity_id', 'student_id'),
+        # Listado paginado de resultados de una actividad
+        db.Index('ix_results_activity_completed', 'activity_id', 'completed_at'),
+        # Un resultado de la escritura diferida se inserta una sola vez (reintentos y spool)
+        db.Index('ix_results_submission_id', 'submission_id', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -76,6 +97,145 @@ class Result(db.Model):
     time_spent = db.Column(db.Integer)  # segundos
     attempts = db.Column(db.Integer, default=1)
     completed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Opción elegida en cada pregunta, un byte por pregunta en orden de id:
+    # 0 = sin responder, 1-4 = a-d (ver app/grading.py). Las preguntas nunca se
+    # borran, así que las que se agreguen después quedan al final del vector.
+    answers = db.Column(db.LargeBinary)
+    # Id del envío asignado por app/writebehind.py; None en los envíos síncronos
+    submission_id = db.Column(db.String(32))
     
     def __repr__(self):
-        return f'<Result Student:{self.student_id} Activity:{self.activity_id} Score:{self.score}>'
\ No newline at end of file
+        return f'<Result Student:{self.student_id} Activity:{self.activity_id} Score:{self.score}>'
+
+class Attempt(db.Model):
+    """Intento de un estudiante en una actividad, desde que abre el examen hasta que lo envía"""
+    __tablename__ = 'attempts'
+    __table_args__ = (
+        # Intento abierto de un estudiante en una actividad y número de intentos enviados
+        db.Index('ix_attempts_student_activity_status', 'student_id', 'activity_id', 'status', 'started_at'),
+        # El barrido busca los intentos abiertos más antiguos
+        db.Index('ix_attempts_status_started', 'status', 'started_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    activity_id = db.Column(db.Integer, db.ForeignKey('activities.id'), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='open')  # 'open', 'submitted', 'expired'
+    seed = db.Column(db.Integer)  # orden de preguntas y opciones (grading.exam_order); None = original
+    started_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    submitted_at = db.Column(db.DateTime)
+    
+    def __repr__(self):
+        return f'<Attempt {self.id} Student:{self.student_id} Activity:{self.activity_id} {self.status}>'
+
+class StudentStats(db.Model):
+    __tablename__ = 'student_stats'
+    
+    student_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    percentage_sum = db.Column(db.Float, nullable=False, default=0)
+    time_spent_sum = db.Column(db.Integer, nullable=False, default=0)
+    timed_attempts = db.Column(db.Integer, nullable=False, default=0)  # intentos con time_spent
+    recent_scores = db.Column(db.JSON, nullable=False, default=list)  # últimos porcentajes, el más reciente primero
+    
+    @property
+    def average(self):
+        return self.percentage_sum / self.attempts if self.attempts else 0
+    
+    def __repr__(self):
+        return f'<StudentStats Student:{self.student_id} Attempts:{self.attempts}>'
+
+
+class StudentFeatures(db.Model):
+    """Vector de características del estudiante para las recomendaciones.
+
+    Se actualiza con cada resultado (app/recommender.py) con promedios
+    exponenciales, así que recomendar no vuelve a leer el historial.
+    """
+    __tablename__ = 'student_features'
+    
+    student_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    ewma_score = db.Column(db.Float)  # porcentaje, ponderando más los últimos resultados
+    trend = db.Column(db.Float, nullable=False, default=0)  # puntos que sube (o baja) por intento
+    time_per_point = db.Column(db.Float)  # segundos por punto del puntaje máximo
+    subject_scores = db.Column(db.JSON, nullable=False, default=dict)  # materia -> porcentaje ponderado
+    difficulty_scores = db.Column(db.JSON, nullable=False, default=dict)  # dificultad -> porcentaje ponderado
+    
+    def __repr__(self):
+        return f'<StudentFeatures Student:{self.student_id} Score:{self.ewma_score}>'
+
+
+class ActivityStats(db.Model):
+    __tablename__ = 'activity_stats'
+    
+    activity_id = db.Column(db.Integer, db.ForeignKey('activities.id'), primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    pass_count = db.Column(db.Integer, nullable=False, default=0)
+    percentage_sum = db.Column(db.Float, nullable=False, default=0)
+    time_spent_sum = db.Column(db.Integer, nullable=False, default=0)
+    timed_attempts = db.Column(db.Integer, nullable=False, default=0)
+    
+    @property
+    def average(self):
+        return self.percentage_sum / self.attempts if self.attempts else 0
+    
+    def __repr__(self):
+        return f'<ActivityStats Activity:{self.activity_id} Attempts:{self.attempts}>'
+
+
+class QuestionStats(db.Model):
+    """Elecciones acumuladas de cada pregunta, actualizadas con cada envío"""
+    __tablename__ = 'question_stats'
+    __table_args__ = (
+        # Preguntas que más falla un grupo: búsqueda por actividad ya ordenada
+        db.Index('ix_question_stats_activity_percent', 'activity_id', 'percent_correct'),
+    )
+    
+    question_id = db.Column(db.Integer, db.ForeignKey('questions.id'), primary_key=True)
+    activity_id = db.Column(db.Integer, db.ForeignKey('activities.id'), nullable=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    correct = db.Column(db.Integer, nullable=False, default=0)
+    blank = db.Column(db.Integer, nullable=False, default=0)
+    count_a = db.Column(db.Integer, nullable=False, default=0)
+    count_b = db.Column(db.Integer, nullable=False, default=0)
+    count_c = db.Column(db.Integer, nullable=False, default=0)
+    count_d = db.Column(db.Integer, nullable=False, default=0)
+    percent_correct = db.Column(db.Float, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<QuestionStats Question:{self.question_id} Correct:{self.percent_correct:.1f}%>'
+
+
+class Job(db.Model):
+    """Tarea en segundo plano de app/jobs.py; la tabla hace de cola sin broker externo"""
+    __tablename__ = 'jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), nullable=False)
+    args = db.Column(db.Text, nullable=False, default='{}')  # JSON con claves ordenadas, comparable
+    status = db.Column(db.String(20), nullable=False, default='pending')  # 'pending', 'running', 'done', 'failed'
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    __table_args__ = (
+        # El despachador busca las pendientes más antiguas
+        db.Index('ix_jobs_status_created', 'status', 'created_at'),
+    )
+    
+    def __repr__(self):
+        return f'<Job {self.id} {self.name} {self.status}>'
+
+
+class Snapshot(db.Model):
+    """Último resultado precalculado de un análisis (resumen del docente, estadísticas...)"""
+    __tablename__ = 'snapshots'
+    
+    key = db.Column(db.String(100), primary_key=True)  # p. ej. 'teacher_overview:5'
+    data = db.Column(db.JSON, nullable=False)
+    computed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<Snapshot {self.key} {self.computed_at}>'
@@ -0,0 +1,91 @@
+from datetime import datetime
+from flask import current_app, request
+from itsdangerous import URLSafeSerializer, BadSignature
+from sqlalchemy import tuple_
+
+
+class KeysetPage:
+    """Una página de resultados con el token para pedir la siguiente"""
+
+    def __init__(self, items, next_cursor, cursor, per_page):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.cursor = cursor
+        self.per_page = per_page
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def is_first(self):
+        return self.cursor is None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def _serializer():
+    return URLSafeSerializer(current_app.config['SECRET_KEY'], salt='keyset-page')
+
+
+def encode_cursor(values):
+    """Convierte los valores de la última fila en un token opaco y firmado"""
+    return _serializer().dumps([
+        {'dt': value.isoformat()} if isinstance(value, datetime) else value
+        for value in values
+    ])
+
+
+def decode_cursor(token):
+    """Devuelve los valores del token, o None si falta o no es válido"""
+    if not token:
+        return None
+    try:
+        values = _serializer().loads(token)
+    except BadSignature:
+        return None
+    return [
+        datetime.fromisoformat(value['dt']) if isinstance(value, dict) else value
+        for value in values
+    ]
+
+
+def page_size():
+    """Tamaño de página pedido en ?per_page=, acotado por la configuración"""
+    default = current_app.config.get('PAGE_SIZE', 50)
+    maximum = current_app.config.get('MAX_PAGE_SIZE', 200)
+    size = request.args.get('per_page', default, type=int)
+    return max(1, min(size, maximum))
+
+
+def keyset_paginate(query, columns, cursor=None, per_page=None):
+    """Pagina `query` por los valores de `columns` en orden ascendente.
+
+    La última columna debe ser única (normalmente el id). En lugar de OFFSET se
+    filtra por `(columnas) > (valores de la última fila)`, así que cualquier
+    página cuesta lo mismo que la primera si existe un índice con ese orden.
+    """
+    if cursor is None:
+        cursor = request.args.get('after')
+    per_page = per_page or page_size()
+
+    values = decode_cursor(cursor)
+    if values is not None and len(values) == len(columns):
+        query = query.filter(tuple_(*columns) > tuple_(*values))
+    else:
+        cursor = None
+
+    rows = query.order_by(*columns).limit(per_page + 1).all()
+    items = rows[:per_page]
+
+    next_cursor = None
+    if len(rows) > per_page:
+        last = items[-1]
+        entity = last[0] if hasattr(last, '_mapping') else last
+        next_cursor = encode_cursor([getattr(entity, column.key) for column in columns])
+
+    return KeysetPage(items, next_cursor, cursor, per_page)
@@ -0,0 +1,138 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from werkzeug.security import generate_password_hash, check_password_hash
+from app.caching import MemoryCache
+
+DEFAULT_METHOD = 'pbkdf2:sha256:600000'  # el de werkzeug 2.3
+
+
+class HasherBusy(Exception):
+    """No hubo un hilo de hash libre dentro de PASSWORD_HASH_TIMEOUT"""
+
+
+class PasswordHasher:
+    """Política de hash de contraseñas y pool de hilos que los calcula.
+
+    PASSWORD_HASH_METHOD usa el formato de werkzeug con el costo explícito
+    ('scrypt:32768:8:1', 'pbkdf2:sha256:600000'): un hash guardado con otro
+    prefijo se recalcula al verificarlo, así que cambiar la política migra a
+    los usuarios en su siguiente inicio de sesión.
+
+    Los hashes se calculan en un pool de PASSWORD_HASH_WORKERS hilos (hashlib
+    libera el GIL), de modo que un pico de inicios de sesión no ocupa todos
+    los hilos del servidor: las peticiones esperan turno como mucho
+    PASSWORD_HASH_TIMEOUT segundos y si no, reciben un 503.
+    """
+
+    def __init__(self):
+        self.method = DEFAULT_METHOD
+        self.workers = 2
+        self.timeout = 5
+        self._executor = None
+        self._lock = threading.Lock()
+        self._dummy_hash = None
+
+    def init_app(self, app):
+        self.method = app.config.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD)
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS', 2)
+        self.timeout = app.config.get('PASSWORD_HASH_TIMEOUT', 5)
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password')
+            self._dummy_hash = None
+        app.extensions['password_hasher'] = self
+
+    def hash(self, password):
+        return generate_password_hash(password, method=self.method)
+
+    def needs_rehash(self, password_hash):
+        return password_hash.split('$', 1)[0] != self.method
+
+    def _check(self, password_hash, password):
+        if password_hash is None:
+            # Usuario inexistente: se paga el mismo costo para no revelar qué nombres existen
+            if self._dummy_hash is None:
+                self._dummy_hash = self.hash('')
+            check_password_hash(self._dummy_hash, password)
+            return False, None
+        if not check_password_hash(password_hash, password):
+            return False, None
+        return True, self.hash(password) if self.needs_rehash(password_hash) else None
+
+    def verify(self, password_hash, password):
+        """Comprueba una contraseña en el pool de hilos.
+
+        Devuelve (correcta, hash nuevo o None); el hash nuevo solo se calcula
+        si el guardado no sigue la política actual. Lanza HasherBusy si el
+        pool no lo atiende a tiempo.
+        """
+        if self._executor is None:
+            return self._check(password_hash, password)
+        future = self._executor.submit(self._check, password_hash, password)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise HasherBusy()
+
+
+class LoginThrottle:
+    """Presupuesto de intentos fallidos de inicio de sesión por IP y por usuario.
+
+    Cuenta los fallos en ventanas fijas de LOGIN_FAILURE_WINDOW segundos y, al
+    agotar el presupuesto, rechaza los intentos sin calcular ningún hash. Los
+    contadores viven en una MemoryCache de LOGIN_THROTTLE_MAX_KEYS entradas
+    (por proceso, se descartan las más antiguas). Un inicio de sesión correcto
+    reinicia el contador del usuario; el de la IP no, porque muchos
+    estudiantes comparten la IP del colegio y su límite es más alto.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._failures = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.enabled = app.config.get('LOGIN_THROTTLE_ENABLED', True)
+        self.max_per_user = app.config.get('LOGIN_MAX_FAILURES_PER_USER', 5)
+        self.max_per_ip = app.config.get('LOGIN_MAX_FAILURES_PER_IP', 100)
+        self.window = app.config.get('LOGIN_FAILURE_WINDOW', 300)
+        self._failures = MemoryCache(max_entries=app.config.get('LOGIN_THROTTLE_MAX_KEYS', 10000),
+                                     default_ttl=self.window)
+        app.extensions['login_throttle'] = self
+
+    def _budgets(self, ip, username):
+        return [(f'ip:{ip}', self.max_per_ip), (f'user:{(username or "").lower()}', self.max_per_user)]
+
+    def retry_after(self, ip, username):
+        """Segundos hasta que se pueda volver a intentar, o 0 si queda presupuesto"""
+        if not self.enabled:
+            return 0
+        wait = 0
+        for key, limit in self._budgets(ip, username):
+            failures, window_end = self._failures.get(key) or (0, 0)
+            if failures >= limit:
+                wait = max(wait, window_end - time.monotonic())
+        return max(0, int(wait + 0.999))
+
+    def record_failure(self, ip, username):
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        with self._lock:
+            for key, _ in self._budgets(ip, username):
+                failures, window_end = self._failures.get(key) or (0, now + self.window)
+                self._failures.set(key, (failures + 1, window_end), ttl=max(window_end - now, 0))
+
+    def record_success(self, ip, username):
+        if self.enabled:
+            self._failures.delete(self._budgets(ip, username)[1][0])
+
+    def stats(self):
+        return self._failures.stats() if self._failures else {}
+
+
+password_hasher = PasswordHasher()
+login_throttle = LoginThrottle()
@@ -0,0 +1,172 @@
+from app.models import Result, Activity, User, Question, StudentStats, ActivityStats, QuestionStats
+from app import db
+from sqlalchemy import func
+
+# Umbral de aprobación usado en todas las estadísticas
+PASSING_PERCENTAGE = 60
+
+
+def student_average(student_id):
+    """Promedio de porcentaje de un estudiante leído de student_stats"""
+    stats = db.session.get(StudentStats, student_id)
+    return stats.average if stats else 0
+
+
+def teacher_activity_ids(teacher_id):
+    """Subconsulta con los ids de las actividades de un docente"""
+    return db.session.query(Activity.id).filter(
+        Activity.teacher_id == teacher_id
+    ).scalar_subquery()
+
+
+def question_count_column():
+    """Subconsulta correlacionada con el número de preguntas de cada actividad.
+
+    Usa el índice de questions.activity_id y evita cargar las preguntas.
+    """
+    return db.session.query(func.count(Question.id)).filter(
+        Question.activity_id == Activity.id
+    ).correlate(Activity).scalar_subquery()
+
+
+def with_question_counts(activity_query):
+    """Carga actividades junto con su número de preguntas.
+
+    Devuelve (lista de actividades, {activity_id: preguntas}).
+    """
+    rows = activity_query.add_columns(question_count_column()).all()
+    return [activity for activity, _ in rows], {activity.id: count for activity, count in rows}
+
+
+def activity_summary(activity_id):
+    """Intentos, promedio, aprobados y tiempo medio de una actividad leídos de activity_stats"""
+    stats = db.session.get(ActivityStats, activity_id)
+    if stats is None:
+        return {'total': 0, 'average': 0, 'passed': 0, 'avg_time': 0}
+
+    return {
+        'total': stats.attempts,
+        'average': stats.average,
+        'passed': stats.pass_count,
+        'avg_time': stats.time_spent_sum / stats.timed_attempts if stats.timed_attempts else 0
+    }
+
+
+def teacher_summary(teacher_id):
+    """Actividades, resultados, estudiantes distintos y promedio de un docente"""
+    total_activities = db.session.query(func.count(Activity.id)).filter(
+        Activity.teacher_id == teacher_id
+    ).scalar()
+
+    total_results, percentage_sum = db.session.query(
+        func.sum(ActivityStats.attempts),
+        func.sum(ActivityStats.percentage_sum)
+    ).join(Activity, Activity.id == ActivityStats.activity_id).filter(
+        Activity.teacher_id == teacher_id
+    ).one()
+
+    total_students = db.session.query(func.count(func.distinct(Result.student_id))).filter(
+        Result.activity_id.in_(teacher_activity_ids(teacher_id))
+    ).scalar() if total_results else 0
+    average = percentage_sum / total_results if total_results else 0
+
+    return {
+        'total_activities': total_activities or 0,
+        'total_results': total_results or 0,
+        'total_students': total_students or 0,
+        'average': average or 0
+    }
+
+
+def struggling_students(teacher_id, threshold=PASSING_PERCENTAGE):
+    """Estudiantes del docente cuyo promedio general está por debajo del umbral.
+
+    Devuelve tuplas (User, promedio). El promedio se lee de student_stats y
+    abarca todos los resultados del estudiante, no solo los del docente.
+    """
+    teacher_students = db.session.query(Result.student_id).filter(
+        Result.activity_id.in_(teacher_activity_ids(teacher_id))
+    ).distinct()
+
+    rows = db.session.query(User, StudentStats).join(
+        StudentStats, StudentStats.student_id == User.id
+    ).filter(
+        User.role == 'student',
+        User.id.in_(teacher_students),
+        StudentStats.attempts > 0,
+        StudentStats.percentage_sum < threshold * StudentStats.attempts
+    ).order_by(User.id).all()
+    return [(student, stats.average) for student, stats in rows]
+
+
+def teacher_roster(teacher_id):
+    """Promedio general y actividades completadas de cada estudiante del docente.
+
+    Devuelve tuplas (User, promedio, completadas) en una sola consulta: el
+    promedio sale de student_stats y el conteo agrupa solo los resultados en
+    actividades del docente.
+    """
+    completed = db.session.query(
+        Result.student_id.label('student_id'),
+        func.count(Result.id).label('completed')
+    ).filter(
+        Result.activity_id.in_(teacher_activity_ids(teacher_id))
+    ).group_by(Result.student_id).subquery()
+
+    rows = db.session.query(User, StudentStats, completed.c.completed).join(
+        completed, completed.c.student_id == User.id
+    ).outerjoin(
+        StudentStats, StudentStats.student_id == User.id
+    ).filter(User.role == 'student').order_by(User.id).all()
+    return [
+        (student, stats.average if stats else 0, count)
+        for student, stats, count in rows
+    ]
+
+
+def question_stats(activity_id):
+    """Preguntas de una actividad con sus elecciones acumuladas.
+
+    Devuelve tuplas (Question, QuestionStats o None) en orden de id.
+    """
+    return db.session.query(Question, QuestionStats).outerjoin(
+        QuestionStats, QuestionStats.question_id == Question.id
+    ).filter(Question.activity_id == activity_id).order_by(Question.id).all()
+
+
+def failing_questions(teacher_id, limit=10, threshold=PASSING_PERCENTAGE):
+    """Preguntas del docente con menor porcentaje de acierto, por debajo del umbral.
+
+    Recorre el índice (activity_id, percent_correct) de question_stats: no lee
+    los resultados. Devuelve tuplas (Question, QuestionStats, título de la actividad).
+    """
+    return db.session.query(Question, QuestionStats, Activity.title).join(
+        QuestionStats, QuestionStats.question_id == Question.id
+    ).join(
+        Activity, Activity.id == QuestionStats.activity_id
+    ).filter(
+        Activity.teacher_id == teacher_id,
+        QuestionStats.percent_correct < threshold
+    ).order_by(QuestionStats.percent_correct, Question.id).limit(limit).all()
+
+
+def activity_catalog():
+    """Pares (materia, dificultad) con al menos una actividad activa"""
+    return [tuple(pair) for pair in db.session.query(Activity.subject, Activity.difficulty).filter_by(
+        is_active=True
+    ).distinct().all()]
+
+
+def unattempted_activities(student_id, subject, difficulty, limit):
+    """Actividades activas de una materia y dificultad que el estudiante no resolvió.
+
+    Recorre el índice (subject, difficulty, is_active) y descarta las resueltas
+    con el índice (activity_id, student_id) de results.
+    """
+    attempted = db.session.query(Result.id).filter(
+        Result.activity_id == Activity.id,
+        Result.student_id == student_id
+    ).exists()
+    return Activity.query.filter_by(
+        subject=subject, difficulty=difficulty, is_active=True
+    ).filter(~attempted).order_by(Activity.id).limit(limit).all()
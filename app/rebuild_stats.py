@@ -0,0 +1,29 @@
+import sys
+from pathlib import Path
+
+# Permite ejecutar el script directamente (python app/rebuild_stats.py).
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from app import create_app
+from app.schema import upgrade_schema
+from app.stats import rebuild_stats, verify_stats
+
+app = create_app()
+
+with app.app_context():
+    # Tablas y columnas nuevas (p. ej. results.answers) en bases sin migrar
+    upgrade_schema()
+
+    print("🔄 Recalculando estadísticas por estudiante, actividad y pregunta...")
+    students, activities, questions = rebuild_stats()
+    print(f"✅ {students} estudiantes, {activities} actividades y {questions} preguntas resumidos")
+
+    print("🔍 Verificando contra la tabla de resultados...")
+    errors = verify_stats()
+    if errors:
+        for error in errors:
+            print(f"   ❌ {error}")
+        sys.exit(1)
+    print("✅ Los resúmenes coinciden con los resultados")
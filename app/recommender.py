@@ -0,0 +1,108 @@
+from app.models import StudentFeatures, Activity
+from app import db, queries
+
+# Peso del último resultado en los promedios exponenciales
+FEATURE_ALPHA = 0.3
+# Peso del último cambio en la tendencia
+TREND_ALPHA = 0.5
+# Porcentaje esperado con el que una actividad es un reto adecuado
+TARGET_SCORE = 75
+# Porcentaje supuesto de un estudiante sin resultados
+PRIOR_SCORE = 70
+# Diferencia típica con el promedio del estudiante según la dificultad, mientras
+# no tenga resultados propios en ese nivel
+DIFFICULTY_OFFSETS = {'easy': 8, 'medium': 0, 'hard': -12}
+# Ventaja de las materias que el estudiante todavía no practicó
+EXPLORATION_BONUS = 5
+RECOMMENDATION_LIMIT = 3
+
+
+def _ewma(previous, value, alpha=FEATURE_ALPHA):
+    return value if previous is None else previous + alpha * (value - previous)
+
+
+def new_features(student_id):
+    return StudentFeatures(student_id=student_id, attempts=0, ewma_score=None, trend=0,
+                           time_per_point=None, subject_scores={}, difficulty_scores={})
+
+
+def apply_result(features, percentage, time_spent, max_score, subject, difficulty):
+    """Suma un resultado al vector de características, sin leer el historial"""
+    if features.ewma_score is not None:
+        features.trend = _ewma(features.trend, percentage - features.ewma_score, TREND_ALPHA)
+    features.ewma_score = _ewma(features.ewma_score, percentage)
+    if time_spent and max_score:
+        features.time_per_point = _ewma(features.time_per_point, time_spent / max_score)
+
+    # Los JSON se reemplazan en vez de modificarse para que SQLAlchemy detecte el cambio
+    if subject:
+        subject_scores = dict(features.subject_scores or {})
+        subject_scores[subject] = _ewma(subject_scores.get(subject), percentage)
+        features.subject_scores = subject_scores
+    if difficulty:
+        difficulty_scores = dict(features.difficulty_scores or {})
+        difficulty_scores[difficulty] = _ewma(difficulty_scores.get(difficulty), percentage)
+        features.difficulty_scores = difficulty_scores
+    features.attempts = (features.attempts or 0) + 1
+
+
+def record_features(result):
+    """Actualiza las características del estudiante con un nuevo resultado.
+
+    Como record_result, no hace commit.
+    """
+    activity = db.session.get(Activity, result.activity_id)
+    features = db.session.get(StudentFeatures, result.student_id)
+    if features is None:
+        features = new_features(result.student_id)
+        db.session.add(features)
+    apply_result(features, result.percentage, result.time_spent, result.max_score,
+                 activity.subject, activity.difficulty)
+    db.session.flush()
+
+
+# ==================== PREDICCIÓN ====================
+
+def predict(features, subject, difficulty):
+    """Porcentaje esperado del estudiante en una actividad de esa materia y dificultad"""
+    if features is None or features.ewma_score is None:
+        return PRIOR_SCORE + DIFFICULTY_OFFSETS.get(difficulty, 0)
+    overall = features.ewma_score
+    base = (features.subject_scores or {}).get(subject, overall)
+    known = features.difficulty_scores or {}
+    offset = known[difficulty] - overall if difficulty in known else DIFFICULTY_OFFSETS.get(difficulty, 0)
+    return min(100.0, max(0.0, base + offset + features.trend))
+
+
+def fit(features, subject, difficulty):
+    """Qué tan adecuada es una actividad: mayor cuanto más cerca de TARGET_SCORE"""
+    score = -abs(predict(features, subject, difficulty) - TARGET_SCORE)
+    if features is None or subject not in (features.subject_scores or {}):
+        score += EXPLORATION_BONUS
+    return score
+
+
+def suggested_difficulty(features):
+    """Dificultad cuyo porcentaje esperado queda más cerca de TARGET_SCORE"""
+    if features is None or features.ewma_score is None:
+        return 'easy'
+    return min(DIFFICULTY_OFFSETS, key=lambda difficulty: abs(predict(features, None, difficulty) - TARGET_SCORE))
+
+
+def rank_activities(student_id, catalog, limit=RECOMMENDATION_LIMIT):
+    """Actividades no resueltas por el estudiante, de la más a la menos adecuada.
+
+    `catalog` son los pares (materia, dificultad) con actividades activas. Se
+    ordenan con el vector del estudiante y se piden candidatas grupo por grupo
+    con el índice de materia y dificultad hasta juntar `limit`. Devuelve
+    tuplas (Activity, porcentaje esperado).
+    """
+    features = db.session.get(StudentFeatures, student_id)
+    ranked = []
+    for subject, difficulty in sorted(catalog, key=lambda pair: -fit(features, *pair)):
+        if len(ranked) >= limit:
+            break
+        expected = predict(features, subject, difficulty)
+        for activity in queries.unattempted_activities(student_id, subject, difficulty, limit - len(ranked)):
+            ranked.append((activity, expected))
+    return ranked
@@ -1,10 +1,26 @@
-from flask import render_template, redirect, url_for, flash, request, session, current_app
+from flask import render_template, redirect, url_for, flash, request, session, current_app, jsonify, Response, stream_with_context, abort, make_response
 from flask_login import login_user, logout_user, login_required, current_user
-from app import db
-from app.models import User, Activity, Question, Result
-from app.forms import RegistrationForm, LoginForm, ActivityForm, QuestionForm
-from app.logic import LogicEngine
+from app import db, cache
+from app.models import User, Activity, Question, Result, StudentStats, Attempt
+from app.forms import RegistrationForm, LoginForm, ActivityForm, QuestionForm, ImportQuestionsForm
+from app.queries import with_question_counts, question_count_column
+from app.pagination import keyset_paginate
+from app.export import results_query, stream_results, EXPORT_FORMATS
+from app.importer import allowed_file, import_questions_file, READERS
+from app.instrumentation import profiler
+from app.passwords import password_hasher, login_throttle, HasherBusy
+from app.identity import identity_cache
+from app.fragments import exam_fragments, exam_page_header, bump_activity_version
+from werkzeug.utils import secure_filename
+from app.logic import LogicEngine, clear_request_cache, result_cache_keys, activity_cache_keys, user_cache_keys
+from app.stats import record_result, record_answers
+from app.grading import answer_key
+from app.attempts import start_attempt, finish_attempt, time_spent as attempt_time_spent
+from app.writebehind import result_writer
+from app.jobs import job_runner, describe_age
+from sqlalchemy.orm import joinedload
 from datetime import datetime
+import os
 from functools import wraps
 
 # Decorador para verificar roles
@@ -19,6 +35,16 @@ def role_required(role):
         return decorated_function
     return decorator
 
+def export_response(query, fmt, filename):
+    """Respuesta HTTP que envía la exportación por fragmentos a medida que se genera"""
+    if fmt not in EXPORT_FORMATS:
+        abort(404)
+    return Response(
+        stream_with_context(stream_results(query, fmt)),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename={filename}.{fmt}'}
+    )
+
 def init_routes(app):
     
     @app.route('/')
@@ -47,6 +73,9 @@ def init_routes(app):
             user.set_password(form.password.data)
             db.session.add(user)
             db.session.commit()
+            keys = user_cache_keys(user)
+            cache.delete(*keys)
+            job_runner.refresh(keys)
             
             flash(f'Cuenta creada exitosamente para {form.username.data}!', 'success')
             return redirect(url_for('login'))
@@ -60,9 +89,27 @@ def init_routes(app):
         
         form = LoginForm()
         if form.validate_on_submit():
+            ip = request.remote_addr
+            wait = login_throttle.retry_after(ip, form.username.data)
+            if wait:
+                # Presupuesto agotado: se rechaza sin calcular el hash
+                flash(f'Demasiados intentos fallidos. Intenta de nuevo en {wait} segundos', 'danger')
+                return render_template('login.html', form=form), 429, {'Retry-After': str(wait)}
+            
             user = User.query.filter_by(username=form.username.data).first()
+            try:
+                valid, new_hash = password_hasher.verify(user.password_hash if user else None,
+                                                         form.password.data)
+            except HasherBusy:
+                flash('El servidor está ocupado, intenta de nuevo en unos segundos', 'warning')
+                return render_template('login.html', form=form), 503, {'Retry-After': '5'}
             
-            if user and user.check_password(form.password.data):
+            if valid:
+                login_throttle.record_success(ip, user.username)
+                if new_hash:
+                    # La política de hash cambió: se guarda el hash nuevo
+                    user.password_hash = new_hash
+                    db.session.commit()
                 login_user(user)
                 flash(f'Bienvenido {user.username}!', 'success')
                 
@@ -77,6 +124,7 @@ def init_routes(app):
                 else:
                     return redirect(url_for('admin_dashboard'))
             else:
+                login_throttle.record_failure(ip, form.username.data)
                 flash('Usuario o contraseña incorrectos', 'danger')
         
         return render_template('login.html', form=form)
@@ -94,68 +142,127 @@ def init_routes(app):
     @login_required
     @role_required('student')
     def student_dashboard():
-        activities = Activity.query.filter_by(is_active=True).all()
+        page = keyset_paginate(
+            Activity.query.filter_by(is_active=True).add_columns(question_count_column()),
+            [Activity.id]
+        )
+        activities = [activity for activity, _ in page]
+        question_counts = {activity.id: count for activity, count in page}
+        
+        # Actividades de esta página ya resueltas por el estudiante
+        completed_activity_ids = set(
+            activity_id for (activity_id,) in db.session.query(Result.activity_id).filter(
+                Result.student_id == current_user.id,
+                Result.activity_id.in_(list(question_counts))
+            ).distinct()
+        )
+        stats = db.session.get(StudentStats, current_user.id)
         
-        # Obtener resultados del estudiante
-        my_results = Result.query.filter_by(student_id=current_user.id).all()
-        completed_activity_ids = set(r.activity_id for r in my_results)
+        # Envíos propios que la escritura diferida todavía no guardó
+        pending_results = result_writer.pending_for(current_user.id)
+        if pending_results:
+            titles = dict(db.session.query(Activity.id, Activity.title).filter(
+                Activity.id.in_({entry['activity_id'] for entry in pending_results})
+            ))
+            pending_results = [dict(entry, title=titles.get(entry['activity_id'])) for entry in pending_results]
+            completed_activity_ids.update(entry['activity_id'] for entry in pending_results)
         
         # Calcular estadísticas
         average = LogicEngine.calculate_student_average(current_user.id)
         performance_level = LogicEngine.get_student_performance_level(current_user.id)
         recommendations = LogicEngine.get_recommendations(current_user.id)
         suggested_difficulty = LogicEngine.adjust_difficulty(current_user.id)
+        suggested_activities = LogicEngine.get_activity_recommendations(current_user.id)
         
         return render_template('student_dashboard.html',
                              activities=activities,
+                             question_counts=question_counts,
+                             page=page,
                              completed_ids=completed_activity_ids,
                              average=round(average, 2),
                              performance_level=performance_level,
                              recommendations=recommendations,
                              suggested_difficulty=suggested_difficulty,
-                             total_completed=len(my_results))
+                             suggested_activities=suggested_activities,
+                             pending_results=pending_results,
+                             total_completed=(stats.attempts if stats else 0) + len(pending_results))
     
     @app.route('/student/activity/<int:activity_id>', methods=['GET', 'POST'])
     @login_required
     @role_required('student')
     def student_activity(activity_id):
-        activity = Activity.query.get_or_404(activity_id)
-        
         if request.method == 'POST':
-            # Procesar respuestas
-            score = 0
-            max_score = 0
-            start_time = session.get('activity_start_time', datetime.utcnow().timestamp())
-            
-            for question in activity.questions:
-                max_score += question.points
-                answer = request.form.get(f'question_{question.id}')
-                if answer and answer.lower() == question.correct_answer.lower():
-                    score += question.points
+            # Calificar con la clave de respuestas compilada, sin cargar las preguntas
+            key = answer_key(activity_id)
+            if key is None:
+                abort(404)
+            # El intento guarda la hora de apertura y la semilla del orden mostrado.
+            # Sin intento sin enviar (doble envío, reenvío con el botón atrás o examen
+            # nunca abierto) no se sabe en qué orden se respondió: no se califica
+            attempt, attempt_number = finish_attempt(current_user.id, activity_id)
+            if attempt is None:
+                flash('Este intento ya fue enviado. Abre la actividad de nuevo para otro intento.', 'warning')
+                return redirect(url_for('student_dashboard'))
+            score, answers = key.grade(request.form, attempt.seed)
+            max_score = key.max_score
             
             # Calcular tiempo
-            time_spent = int(datetime.utcnow().timestamp() - start_time)
+            time_spent = attempt_time_spent(attempt)
             percentage = (score / max_score * 100) if max_score > 0 else 0
             
             # Guardar resultado
-            result = Result(
+            values = dict(
                 student_id=current_user.id,
                 activity_id=activity_id,
                 score=score,
                 max_score=max_score,
                 percentage=percentage,
-                time_spent=time_spent
+                time_spent=time_spent,
+                attempts=attempt_number,
+                answers=answers
             )
-            db.session.add(result)
-            db.session.commit()
+            if result_writer.enabled:
+                # Escritura diferida: el hilo de result_writer lo guarda en el próximo lote;
+                # el cierre del intento se guarda ya para que recargar no lo reutilice
+                db.session.commit()
+                result_writer.submit(**values)
+            else:
+                result = Result(**values)
+                db.session.add(result)
+                record_result(result)
+                record_answers([result])
+                db.session.commit()
+                keys = result_cache_keys(result)
+                cache.delete(*keys)
+                job_runner.refresh(keys)
+            clear_request_cache()
             
             flash(f'Actividad completada! Obtuviste {score}/{max_score} puntos ({percentage:.1f}%)', 'success')
             return redirect(url_for('student_dashboard'))
         
-        # Guardar tiempo de inicio
-        session['activity_start_time'] = datetime.utcnow().timestamp()
+        header = exam_page_header(activity_id)
+        if header is None:
+            abort(404)
+        version, title = header
+        
+        # Registrar la apertura: recargar reutiliza el intento abierto, con su
+        # hora de inicio y su semilla del orden de preguntas y opciones
+        attempt = start_attempt(current_user.id, activity_id,
+                                shuffle=current_app.config.get('EXAM_SHUFFLE', True),
+                                max_age=current_app.config.get('ATTEMPT_MAX_AGE'))
+        seed = attempt.seed
         
-        return render_template('student_activity.html', activity=activity)
+        # La página solo cambia con la versión de la actividad y el intento; con
+        # mensajes flash pendientes no se responde 304 para que se muestren
+        etag = f'{exam_fragments.etag(activity_id, version)}-a{attempt.id}'
+        if '_flashes' not in session and request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = make_response(render_template('student_activity.html', title=title,
+                                                     exam_body=exam_fragments.render(activity_id, version, seed)))
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
     
     # ==================== RUTAS DE DOCENTE ====================
     
@@ -163,14 +270,28 @@ def init_routes(app):
     @login_required
     @role_required('teacher')
     def teacher_dashboard():
-        activities = Activity.query.filter_by(teacher_id=current_user.id).all()
-        overview = LogicEngine.get_teacher_overview(current_user.id)
-        struggling_students = LogicEngine.detect_struggling_students(current_user.id)
+        activities, question_counts = with_question_counts(
+            Activity.query.filter_by(teacher_id=current_user.id)
+        )
+        
+        # Con tareas en segundo plano se muestra el último snapshot precalculado
+        snapshot = job_runner.snapshot(f'teacher_overview:{current_user.id}')
+        if snapshot is not None:
+            overview = snapshot.data['overview']
+            struggling_students = snapshot.data['struggling']
+        else:
+            roster = LogicEngine.get_teacher_roster(current_user.id)
+            struggling_students = LogicEngine.detect_struggling_students(current_user.id, roster=roster)
+            overview = LogicEngine.get_teacher_overview(current_user.id, struggling=struggling_students)
+            job_runner.enqueue('teacher_snapshot', teacher_id=current_user.id)
         
         return render_template('teacher_dashboard.html',
                              activities=activities,
+                             question_counts=question_counts,
                              overview=overview,
-                             struggling_students=struggling_students)
+                             struggling_students=struggling_students,
+                             failing_questions=LogicEngine.get_failing_questions(current_user.id),
+                             data_age=describe_age(snapshot.computed_at) if snapshot else None)
     
     @app.route('/teacher/create_activity', methods=['GET', 'POST'])
     @login_required
@@ -188,6 +309,9 @@ def init_routes(app):
             )
             db.session.add(activity)
             db.session.commit()
+            keys = activity_cache_keys(activity)
+            cache.delete(*keys)
+            job_runner.refresh(keys)
             
             flash(f'Actividad "{activity.title}" creada exitosamente!', 'success')
             return redirect(url_for('add_questions', activity_id=activity.id))
@@ -198,7 +322,7 @@ def init_routes(app):
     @login_required
     @role_required('teacher')
     def add_questions(activity_id):
-        activity = Activity.query.get_or_404(activity_id)
+        activity = db.get_or_404(Activity, activity_id)
         
         if activity.teacher_id != current_user.id:
             flash('No tienes permisos para editar esta actividad', 'danger')
@@ -218,7 +342,11 @@ def init_routes(app):
                 points=form.points.data
             )
             db.session.add(question)
+            bump_activity_version(activity_id)
             db.session.commit()
+            keys = activity_cache_keys(activity)
+            cache.delete(*keys)
+            job_runner.refresh(keys)
             
             flash('Pregunta agregada exitosamente!', 'success')
             
@@ -227,54 +355,115 @@ def init_routes(app):
             else:
                 return redirect(url_for('teacher_dashboard'))
         
-        return render_template('add_questions.html', form=form, activity=activity)
+        return render_template('add_questions.html', form=form, activity=activity,
+                             import_form=ImportQuestionsForm())
+    
+    @app.route('/teacher/activity/<int:activity_id>/import', methods=['POST'])
+    @login_required
+    @role_required('teacher')
+    def import_questions(activity_id):
+        activity = db.get_or_404(Activity, activity_id)
+        
+        if activity.teacher_id != current_user.id:
+            flash('No tienes permisos para editar esta actividad', 'danger')
+            return redirect(url_for('teacher_dashboard'))
+        
+        form = ImportQuestionsForm()
+        if not form.validate_on_submit():
+            flash('Selecciona un archivo para importar', 'danger')
+            return redirect(url_for('add_questions', activity_id=activity_id))
+        
+        filename = secure_filename(form.file.data.filename)
+        extension = filename.rsplit('.', 1)[-1].lower()
+        if extension not in READERS or not allowed_file(filename, current_app.config['ALLOWED_EXTENSIONS']):
+            flash('Formato no soportado, usa un archivo .csv, .json o .jsonl', 'danger')
+            return redirect(url_for('add_questions', activity_id=activity_id))
+        
+        path = os.path.join(current_app.config['UPLOAD_FOLDER'],
+                            f'import_{current_user.id}_{int(datetime.utcnow().timestamp())}_{filename}')
+        form.file.data.save(path)
+        try:
+            report = import_questions_file(activity_id, path)
+        finally:
+            os.remove(path)
+        keys = activity_cache_keys(activity)
+        cache.delete(*keys)
+        job_runner.refresh(keys)
+        
+        flash(f'{report.inserted} preguntas importadas ({report.rows_per_second} filas/s)',
+              'success' if report.inserted else 'warning')
+        for number, error in report.errors[:10]:
+            flash(f'Fila {number}: {error}', 'danger')
+        if len(report.errors) > 10:
+            flash(f'... y {len(report.errors) - 10} errores más', 'danger')
+        
+        return redirect(url_for('add_questions', activity_id=activity_id))
     
     @app.route('/teacher/students')
     @login_required
     @role_required('teacher')
     def view_students():
-        # Obtener estudiantes que han hecho actividades del docente
-        activities = Activity.query.filter_by(teacher_id=current_user.id).all()
-        activity_ids = [a.id for a in activities]
-        
-        students_data = []
-        students = db.session.query(User).join(Result).filter(
-            Result.activity_id.in_(activity_ids),
-            User.role == 'student'
-        ).distinct().all()
-        
-        for student in students:
-            avg = LogicEngine.calculate_student_average(student.id)
-            results = Result.query.filter_by(student_id=student.id).filter(
-                Result.activity_id.in_(activity_ids)
-            ).all()
-            
-            students_data.append({
-                'student': student,
-                'average': round(avg, 2),
-                'total_activities': len(results),
-                'performance': LogicEngine.get_student_performance_level(student.id)
-            })
-        
-        return render_template('view_students.html', students_data=students_data)
+        # Estudiantes que han hecho actividades del docente, calculados en bloque
+        students_data = LogicEngine.get_teacher_roster(current_user.id)
+        
+        # Dificultad y discriminación de cada actividad, de la más difícil a la más fácil
+        cohort = LogicEngine.get_cohort_analytics(current_user.id)
+        titles = dict(db.session.query(Activity.id, Activity.title).filter_by(teacher_id=current_user.id))
+        item_rows = sorted(
+            (dict(stats, title=titles.get(activity_id)) for activity_id, stats in cohort['items'].items()),
+            key=lambda item: item['difficulty']
+        )
+        
+        return render_template('view_students.html', students_data=students_data,
+                             cohort=cohort, item_rows=item_rows)
     
     @app.route('/teacher/activity/<int:activity_id>/stats')
     @login_required
     @role_required('teacher')
     def activity_stats(activity_id):
-        activity = Activity.query.get_or_404(activity_id)
+        activity = db.get_or_404(Activity, activity_id)
         
         if activity.teacher_id != current_user.id:
             flash('No tienes permisos para ver esta actividad', 'danger')
             return redirect(url_for('teacher_dashboard'))
         
-        stats = LogicEngine.get_activity_stats(activity_id)
-        results = Result.query.filter_by(activity_id=activity_id).all()
+        snapshot = job_runner.snapshot(f'activity_stats:{activity_id}')
+        if snapshot is not None:
+            stats = snapshot.data
+        else:
+            stats = LogicEngine.get_activity_stats(activity_id)
+            job_runner.enqueue('activity_snapshot', activity_id=activity_id)
+        results = keyset_paginate(
+            Result.query.filter_by(activity_id=activity_id).options(joinedload(Result.student)),
+            [Result.completed_at, Result.id]
+        )
         
         return render_template('activity_stats.html', 
                              activity=activity, 
                              stats=stats,
-                             results=results)
+                             questions=LogicEngine.get_question_analysis(activity_id),
+                             results=results,
+                             data_age=describe_age(snapshot.computed_at) if snapshot else None)
+    
+    @app.route('/teacher/activity/<int:activity_id>/export.<fmt>')
+    @login_required
+    @role_required('teacher')
+    def export_activity_results(activity_id, fmt):
+        activity = db.get_or_404(Activity, activity_id)
+        
+        if activity.teacher_id != current_user.id:
+            flash('No tienes permisos para exportar esta actividad', 'danger')
+            return redirect(url_for('teacher_dashboard'))
+        
+        return export_response(results_query(activity_id=activity_id), fmt,
+                               f'resultados_actividad_{activity_id}')
+    
+    @app.route('/teacher/export.<fmt>')
+    @login_required
+    @role_required('teacher')
+    def export_teacher_results(fmt):
+        return export_response(results_query(teacher_id=current_user.id), fmt,
+                               f'resultados_docente_{current_user.id}')
     
     # ==================== RUTAS DE ADMINISTRADOR ====================
     
@@ -282,43 +471,66 @@ def init_routes(app):
     @login_required
     @role_required('admin')
     def admin_dashboard():
-        total_users = User.query.count()
-        total_students = User.query.filter_by(role='student').count()
-        total_teachers = User.query.filter_by(role='teacher').count()
-        total_activities = Activity.query.count()
+        counts = LogicEngine.get_platform_counts()
         
         recent_users = User.query.order_by(User.created_at.desc()).limit(10).all()
         
         return render_template('admin_dashboard.html',
-                             total_users=total_users,
-                             total_students=total_students,
-                             total_teachers=total_teachers,
-                             total_activities=total_activities,
+                             total_users=counts['total_users'],
+                             total_students=counts['total_students'],
+                             total_teachers=counts['total_teachers'],
+                             total_activities=counts['total_activities'],
                              recent_users=recent_users)
     
+    @app.route('/admin/export.<fmt>')
+    @login_required
+    @role_required('admin')
+    def export_all_results(fmt):
+        return export_response(results_query(), fmt, 'resultados')
+    
+    @app.route('/admin/cache')
+    @login_required
+    @role_required('admin')
+    def cache_stats():
+        return jsonify(dict(cache.stats(), identities=identity_cache.stats(), login_throttle=login_throttle.stats(),
+                            exam_fragments=exam_fragments.stats()))
+    
+    @app.route('/admin/jobs')
+    @login_required
+    @role_required('admin')
+    def job_stats():
+        return jsonify(job_runner.stats())
+    
+    @app.route('/admin/metrics')
+    @login_required
+    @role_required('admin')
+    def metrics():
+        if not profiler.enabled:
+            return jsonify({'enabled': False, 'message': 'Activa PROFILING_ENABLED para recolectar métricas'})
+        return jsonify(dict(profiler.metrics.snapshot(), enabled=True))
+    
     @app.route('/admin/users')
     @login_required
     @role_required('admin')
     def manage_users():
-        users = User.query.all()
+        users = keyset_paginate(User.query, [User.id])
         return render_template('manage_users.html', users=users)
     
     @app.route('/admin/user/<int:user_id>/delete', methods=['POST'])
     @login_required
     @role_required('admin')
     def delete_user(user_id):
-        user = User.query.get_or_404(user_id)
+        user = db.get_or_404(User, user_id)
         
         if user.id == current_user.id:
             flash('No puedes eliminar tu propia cuenta', 'danger')
             return redirect(url_for('manage_users'))
         
+        stale_keys = user_cache_keys(user)
+        Attempt.query.filter_by(student_id=user.id).delete()
         db.session.delete(user)
         db.session.commit()
+        cache.delete(*stale_keys)
+        job_runner.refresh(stale_keys)
         flash(f'Usuario {user.username} eliminado correctamente', 'success')
-        return redirect(url_for('manage_users'))
-
-# Inicializar rutas
-from flask import current_app
-with current_app.app_context():
-    init_routes(current_app)
\ No newline at end of file
+        return redirect(url_for('manage_users'))
\ No newline at end of file
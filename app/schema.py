@@ -0,0 +1,140 @@
+from datetime import datetime
+from app.models import Result, Activity, Question, QuestionStats, Attempt
+from app import db
+from sqlalchemy import event, text
+
+# Índices que ya no usa ninguna consulta (las estadísticas de actividad salen de activity_stats)
+OBSOLETE_INDEXES = ['ix_results_activity_percentage']
+
+
+def configure_sqlite(app):
+    """Aplica SQLITE_PRAGMAS a cada conexión nueva del motor.
+
+    Los PRAGMA de SQLite son por conexión (salvo journal_mode=WAL, que queda
+    guardado en el archivo), así que se ejecutan en el evento `connect` del
+    pool y no una sola vez al arrancar.
+    """
+    pragmas = app.config.get('SQLITE_PRAGMAS')
+    if not pragmas:
+        return
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+
+def sqlite_settings():
+    """Valores efectivos de los PRAGMA relevantes en una conexión del pool"""
+    names = ['journal_mode', 'synchronous', 'cache_size', 'mmap_size', 'busy_timeout', 'foreign_keys']
+    with db.engine.connect() as connection:
+        return {name: connection.exec_driver_sql(f'PRAGMA {name}').scalar() for name in names}
+
+
+def upgrade_schema():
+    """Actualiza una base de datos existente sin borrar datos.
+
+    Crea las tablas nuevas, agrega las columnas nuevas (siempre opcionales) a
+    las tablas existentes y crea los índices declarados en los modelos que
+    todavía no existen; borra los índices de OBSOLETE_INDEXES. Devuelve los
+    nombres de las columnas ('tabla.columna') y de los índices creados.
+    """
+    db.create_all()
+
+    created = []
+    inspector = db.inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        columns = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in columns:
+                column_type = column.type.compile(db.engine.dialect)
+                with db.engine.begin() as connection:
+                    connection.exec_driver_sql(
+                        f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'
+                    )
+                created.append(f'{table.name}.{column.name}')
+
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(db.engine)
+                created.append(index.name)
+
+    with db.engine.begin() as connection:
+        for name in OBSOLETE_INDEXES:
+            connection.exec_driver_sql(f'DROP INDEX IF EXISTS {name}')
+    return created
+
+
+def explain(query):
+    """Devuelve las líneas de EXPLAIN QUERY PLAN de una consulta"""
+    statement = query.statement if hasattr(query, 'statement') else query
+    sql = str(statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+    rows = db.session.execute(text('EXPLAIN QUERY PLAN ' + sql)).all()
+    return [row[-1] for row in rows]
+
+
+def hot_queries():
+    """Consultas frecuentes de la aplicación y el índice que deben usar"""
+    teacher_activities = db.session.query(Activity.id).filter(
+        Activity.teacher_id == 1
+    ).scalar_subquery()
+
+    return [
+        ('últimos resultados del estudiante',
+         Result.query.filter_by(student_id=1).order_by(Result.completed_at.desc()).limit(5),
+         'ix_results_student_completed'),
+        ('estudiantes del docente',
+         db.session.query(Result.student_id).filter(
+             Result.activity_id.in_(teacher_activities)).distinct(),
+         'ix_results_activity_student'),
+        ('resultados paginados de una actividad',
+         Result.query.filter_by(activity_id=1).order_by(Result.completed_at, Result.id).limit(50),
+         'ix_results_activity_completed'),
+        ('actividades del docente',
+         Activity.query.filter_by(teacher_id=1),
+         'ix_activities_teacher_id'),
+        ('preguntas de una actividad',
+         Question.query.filter_by(activity_id=1),
+         'ix_questions_activity_id'),
+        ('actividades sin resolver de una materia y dificultad',
+         Activity.query.filter_by(subject='Matemáticas', difficulty='easy', is_active=True).filter(
+             ~db.session.query(Result.id).filter(
+                 Result.activity_id == Activity.id, Result.student_id == 1).exists()
+         ).order_by(Activity.id).limit(3),
+         'ix_activities_subject_difficulty'),
+        ('preguntas más falladas de una actividad',
+         QuestionStats.query.filter(QuestionStats.activity_id == 1).order_by(QuestionStats.percent_correct),
+         'ix_question_stats_activity_percent'),
+        ('intento abierto del estudiante',
+         Attempt.query.filter(Attempt.student_id == 1, Attempt.activity_id == 1, Attempt.status == 'open').order_by(
+             Attempt.started_at.desc()).limit(1),
+         'ix_attempts_student_activity_status'),
+        ('intentos abiertos vencidos',
+         db.session.query(Attempt.id).filter(
+             Attempt.status == 'open', Attempt.started_at < datetime(2000, 1, 1)
+         ).order_by(Attempt.started_at).limit(500),
+         'ix_attempts_status_started'),
+    ]
+
+
+def check_query_plans():
+    """Verifica que cada consulta frecuente use su índice y no ordene en memoria.
+
+    Devuelve tuplas (nombre, correcto, plan).
+    """
+    report = []
+    for name, query, index_name in hot_queries():
+        plan = explain(query)
+        ok = (
+            any(index_name in line for line in plan)
+            and not any('USE TEMP B-TREE FOR ORDER BY' in line for line in plan)
+        )
+        report.append((name, ok, plan))
+    return report
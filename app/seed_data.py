@@ -0,0 +1,61 @@
+import sys
+import argparse
+import os
+from pathlib import Path
+
+# Permite ejecutar el script directamente (python app/seed_data.py).
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from config import Config
+from app import create_app
+from app.models import User
+from app.schema import upgrade_schema
+from app.seeding import SeedParams, seed, PASSWORDS
+from app.stats import rebuild_stats
+
+parser = argparse.ArgumentParser(description='Genera datos sintéticos para pruebas de carga')
+parser.add_argument('--database', default=os.path.join(Config.BASEDIR, 'instance', 'seed.db'),
+                    help='Archivo SQLite de destino (por defecto instance/seed.db)')
+parser.add_argument('--teachers', type=int, default=10)
+parser.add_argument('--students', type=int, default=1000)
+parser.add_argument('--activities', type=int, default=20, help='Actividades por docente')
+parser.add_argument('--questions', type=int, default=10, help='Preguntas por actividad')
+parser.add_argument('--results', type=int, default=20, help='Resultados promedio por estudiante')
+parser.add_argument('--seed', type=int, default=42)
+parser.add_argument('--batch-size', type=int, default=50000, help='Filas por transacción')
+parser.add_argument('--append', action='store_true', help='Agregar datos si la base ya tiene usuarios')
+args = parser.parse_args()
+
+database = os.path.abspath(args.database)
+if 'sqlite:///' + database == Config.SQLALCHEMY_DATABASE_URI:
+    print("❌ El generador no escribe en la base de datos principal, usa otro archivo con --database")
+    sys.exit(1)
+
+
+class SeedConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///' + database
+    CACHE_BACKEND = 'null'
+
+
+app = create_app(SeedConfig)
+
+with app.app_context():
+    upgrade_schema()
+    if User.query.first() is not None and not args.append:
+        print(f"❌ {database} ya tiene datos. Usa --append para agregar más o elige otro archivo.")
+        sys.exit(1)
+
+    params = SeedParams(teachers=args.teachers, students=args.students, activities=args.activities,
+                        questions=args.questions, results=args.results, seed=args.seed,
+                        batch_size=args.batch_size)
+    print(f"🔄 Generando ~{params.expected_results} resultados en {database}...")
+    counts = seed(params)
+
+    print("🔄 Recalculando estadísticas...")
+    rebuild_stats()
+
+    total = sum(v for k, v in counts.items() if k != 'seconds')
+    print(f"✅ {total} filas en {counts['seconds']} s ({round(total / max(counts['seconds'], 0.001))} filas/s)")
+    print(f"   Contraseñas: docentes '{PASSWORDS['teacher']}', estudiantes '{PASSWORDS['student']}'")
@@ -0,0 +1,190 @@
+import math
+import random
+import time
+from datetime import datetime, timedelta
+from itertools import accumulate
+from app.models import User, Activity, Question, Result
+from app import db
+from app.grading import CHOICES
+from app.passwords import password_hasher
+from sqlalchemy import func
+
+SUBJECTS = ['Matemáticas', 'Historia', 'Biología', 'Programación', 'Física', 'Química',
+            'Lengua', 'Geografía', 'Inglés', 'Arte']
+DIFFICULTIES = ['easy', 'medium', 'hard']
+# Penalización sobre el porcentaje esperado según la dificultad
+DIFFICULTY_PENALTY = {'easy': -8, 'medium': 0, 'hard': 12}
+POINTS = [1, 2, 3, 5]
+POINT_WEIGHTS = [50, 30, 15, 5]
+# Probabilidad de dejar una pregunta sin responder
+BLANK_RATE = 0.03
+
+# Contraseñas de los usuarios sintéticos: una por rol
+PASSWORDS = {'teacher': 'profesor123', 'student': 'estudiante123'}
+
+
+class SeedParams:
+    """Parámetros de escala del generador"""
+
+    def __init__(self, teachers=10, students=1000, activities=20, questions=10,
+                 results=20, seed=42, batch_size=50000, term_days=120):
+        self.teachers = teachers
+        self.students = students
+        self.activities = activities  # por docente
+        self.questions = questions  # por actividad
+        self.results = results  # promedio por estudiante
+        self.seed = seed
+        self.batch_size = batch_size
+        self.term_days = term_days
+
+    @property
+    def expected_results(self):
+        return self.students * self.results
+
+
+def _next_id(model):
+    return (db.session.query(func.max(model.id)).scalar() or 0) + 1
+
+
+def _insert(table, rows, batch_size, counter):
+    """Inserta con executemany en transacciones de `batch_size` filas"""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            db.session.execute(table.insert(), batch)
+            db.session.commit()
+            counter[table.name] = counter.get(table.name, 0) + len(batch)
+            batch = []
+    if batch:
+        db.session.execute(table.insert(), batch)
+        db.session.commit()
+        counter[table.name] = counter.get(table.name, 0) + len(batch)
+
+
+def password_hashes():
+    """Un hash por contraseña distinta, no uno por usuario"""
+    return {role: password_hasher.hash(password) for role, password in PASSWORDS.items()}
+
+
+def seed(params, log=print):
+    """Genera datos sintéticos reproducibles con inserciones masivas de Core.
+
+    Las distribuciones son sesgadas como en un curso real: el nivel de cada
+    estudiante es normal, su actividad (cuántos resultados tiene) es
+    log-normal y la popularidad de las actividades sigue una ley de Zipf.
+    Devuelve un dict con las filas insertadas por tabla.
+    """
+    rng = random.Random(params.seed)
+    counter = {}
+    start = time.perf_counter()
+    now = datetime.utcnow()
+    hashes = password_hashes()
+
+    # Usuarios
+    first_user = _next_id(User)
+    teacher_ids = list(range(first_user, first_user + params.teachers))
+    first_student = first_user + params.teachers
+    student_ids = list(range(first_student, first_student + params.students))
+
+    def users():
+        for user_id in teacher_ids:
+            yield {'id': user_id, 'username': f'docente{user_id}', 'email': f'docente{user_id}@seed.local',
+                   'password_hash': hashes['teacher'], 'role': 'teacher',
+                   'created_at': now - timedelta(days=params.term_days + rng.randint(0, 30))}
+        for user_id in student_ids:
+            yield {'id': user_id, 'username': f'estudiante{user_id}', 'email': f'estudiante{user_id}@seed.local',
+                   'password_hash': hashes['student'], 'role': 'student',
+                   'created_at': now - timedelta(days=rng.randint(0, params.term_days))}
+
+    _insert(User.__table__, users(), params.batch_size, counter)
+    log(f"   👤 {counter.get('users', 0)} usuarios")
+
+    # Actividades y preguntas
+    first_activity = _next_id(Activity)
+    activities = []
+    for index, teacher_id in enumerate(t for t in teacher_ids for _ in range(params.activities)):
+        activities.append({
+            'id': first_activity + index,
+            'title': f'Actividad {first_activity + index}',
+            'description': 'Actividad generada para pruebas de carga',
+            'difficulty': rng.choices(DIFFICULTIES, weights=[40, 40, 20])[0],
+            'subject': rng.choice(SUBJECTS),
+            'teacher_id': teacher_id,
+            'created_at': now - timedelta(days=rng.randint(0, params.term_days)),
+            'is_active': rng.random() > 0.05
+        })
+    _insert(Activity.__table__, iter(activities), params.batch_size, counter)
+
+    # Por actividad: (código de la respuesta correcta, puntos, dificultad propia) de
+    # cada pregunta en orden de id, el mismo orden del vector de respuestas
+    answer_keys = {}
+    max_scores = {}
+    next_question = _next_id(Question)
+
+    def questions():
+        nonlocal next_question
+        for activity in activities:
+            key = answer_keys[activity['id']] = []
+            for number in range(params.questions):
+                points = rng.choices(POINTS, weights=POINT_WEIGHTS)[0]
+                correct = rng.choice(CHOICES)
+                key.append((CHOICES.index(correct) + 1, points, rng.gauss(0, 0.15)))
+                yield {'id': next_question, 'activity_id': activity['id'],
+                       'question_text': f'Pregunta {number + 1} de la actividad {activity["id"]}',
+                       'option_a': 'Opción A', 'option_b': 'Opción B',
+                       'option_c': 'Opción C', 'option_d': 'Opción D',
+                       'correct_answer': correct, 'points': points}
+                next_question += 1
+            max_scores[activity['id']] = sum(points for _, points, _ in key)
+
+    _insert(Question.__table__, questions(), params.batch_size, counter)
+    log(f"   📋 {counter.get('activities', 0)} actividades, {counter.get('questions', 0)} preguntas")
+
+    # Resultados
+    if activities and student_ids:
+        # Popularidad tipo Zipf: pocas actividades concentran la mayoría de intentos
+        order = activities[:]
+        rng.shuffle(order)
+        cum_weights = list(accumulate(1 / (rank + 1) ** 1.1 for rank in range(len(order))))
+        sigma = 0.8
+        mu = math.log(max(params.results, 1)) - sigma ** 2 / 2
+
+        def results():
+            for student_id in student_ids:
+                skill = rng.gauss(68, 15)
+                pace = rng.lognormvariate(0, 0.4)
+                for _ in range(int(rng.lognormvariate(mu, sigma)) if params.results else 0):
+                    activity = rng.choices(order, cum_weights=cum_weights)[0]
+                    max_score = max_scores[activity['id']] or 1
+                    expected = skill - DIFFICULTY_PENALTY[activity['difficulty']]
+                    ability = min(100.0, max(0.0, rng.gauss(expected, 12))) / 100
+                    # Cada pregunta se acierta con la probabilidad del intento ajustada
+                    # por su propia dificultad; el puntaje sale de las respuestas
+                    answers = bytearray()
+                    score = 0
+                    for correct, points, shift in answer_keys[activity['id']]:
+                        if rng.random() < BLANK_RATE:
+                            answers.append(0)
+                        elif rng.random() < ability - shift:
+                            answers.append(correct)
+                            score += points
+                        else:
+                            answers.append(rng.choice([c for c in range(1, len(CHOICES) + 1) if c != correct]))
+                    yield {
+                        'student_id': student_id,
+                        'activity_id': activity['id'],
+                        'score': score,
+                        'max_score': max_score,
+                        'percentage': score / max_score * 100,
+                        'time_spent': int(params.questions * 40 * pace * rng.lognormvariate(0, 0.3)),
+                        'attempts': 1,
+                        'answers': bytes(answers),
+                        'completed_at': now - timedelta(seconds=rng.randint(0, params.term_days * 86400))
+                    }
+
+        _insert(Result.__table__, results(), params.batch_size, counter)
+    log(f"   📊 {counter.get('results', 0)} resultados")
+
+    counter['seconds'] = round(time.perf_counter() - start, 2)
+    return counter
@@ -0,0 +1,305 @@
+from app.models import Result, StudentStats, ActivityStats, QuestionStats, Question, StudentFeatures, Activity
+from app import db
+from app.queries import PASSING_PERCENTAGE
+from app.grading import CHOICES, answer_key
+from app.recommender import record_features, new_features, apply_result
+from sqlalchemy import func, case
+from sqlalchemy.dialects.sqlite import insert
+
+QUESTION_COUNTERS = ['attempts', 'correct', 'blank'] + [f'count_{choice}' for choice in CHOICES]
+
+# Cantidad de porcentajes recientes que se guardan por estudiante
+RECENT_WINDOW = 5
+
+
+def _get_or_create(model, key):
+    row = db.session.get(model, key)
+    if row is None:
+        row = model(**{model.__mapper__.primary_key[0].name: key},
+                    attempts=0, percentage_sum=0, time_spent_sum=0, timed_attempts=0)
+        if model is StudentStats:
+            row.recent_scores = []
+        db.session.add(row)
+        db.session.flush()
+    return row
+
+
+def record_result(result):
+    """Actualiza los resúmenes con un nuevo resultado.
+
+    No hace commit: debe llamarse en la misma transacción que inserta el Result.
+    Los contadores se actualizan con expresiones SQL para no perder incrementos
+    de peticiones concurrentes.
+    """
+    timed = 1 if result.time_spent else 0
+    time_spent = result.time_spent or 0
+
+    student = _get_or_create(StudentStats, result.student_id)
+    recent = [result.percentage] + list(student.recent_scores or [])
+    student.recent_scores = recent[:RECENT_WINDOW]
+    student.attempts = StudentStats.attempts + 1
+    student.percentage_sum = StudentStats.percentage_sum + result.percentage
+    student.time_spent_sum = StudentStats.time_spent_sum + time_spent
+    student.timed_attempts = StudentStats.timed_attempts + timed
+
+    activity = _get_or_create(ActivityStats, result.activity_id)
+    activity.attempts = ActivityStats.attempts + 1
+    activity.pass_count = ActivityStats.pass_count + (1 if result.percentage >= PASSING_PERCENTAGE else 0)
+    activity.percentage_sum = ActivityStats.percentage_sum + result.percentage
+    activity.time_spent_sum = ActivityStats.time_spent_sum + time_spent
+    activity.timed_attempts = ActivityStats.timed_attempts + timed
+
+    record_features(result)
+
+
+def _count_answers(counts, activity_id, question_ids, correct_codes, packed):
+    """Suma un vector de respuestas a los contadores por pregunta"""
+    for question_id, correct_code, code in zip(question_ids, correct_codes, packed):
+        row = counts.get(question_id)
+        if row is None:
+            row = counts[question_id] = dict.fromkeys(QUESTION_COUNTERS, 0)
+            row['activity_id'] = activity_id
+        row['attempts'] += 1
+        if code == 0:
+            row['blank'] += 1
+        else:
+            row[f'count_{CHOICES[code - 1]}'] += 1
+            row['correct'] += code == correct_code
+
+
+def _correct_codes(correct_answers, question_ids):
+    """Código de la opción correcta de cada pregunta, en el orden del vector"""
+    return [CHOICES.find(correct_answers[question_id]) + 1 for question_id in question_ids]
+
+
+def record_answers(results):
+    """Suma las respuestas de uno o más resultados a question_stats.
+
+    Agrega en memoria y aplica un solo upsert por lote (INSERT ... ON CONFLICT
+    DO UPDATE con incrementos), así que no hay que leer las filas antes. Como
+    record_result, no hace commit.
+    """
+    counts = {}
+    keys = {}
+    for result in results:
+        if not result.answers:
+            continue
+        if result.activity_id not in keys:
+            keys[result.activity_id] = answer_key(result.activity_id)
+        key = keys[result.activity_id]
+        if key is None:
+            continue
+        question_ids = key.question_ids
+        correct_answers = {question_id: correct for question_id, (correct, _) in key.answers.items()}
+        _count_answers(counts, result.activity_id, question_ids,
+                       _correct_codes(correct_answers, question_ids), result.answers)
+    if not counts:
+        return
+
+    statement = insert(QuestionStats)
+    table = QuestionStats.__table__.c
+    attempts = table.attempts + statement.excluded.attempts
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.question_id],
+        set_=dict(
+            {name: table[name] + statement.excluded[name] for name in QUESTION_COUNTERS},
+            percent_correct=(table.correct + statement.excluded.correct) * 100.0 / attempts
+        )
+    )
+    db.session.execute(statement, [
+        dict(row, question_id=question_id, percent_correct=row['correct'] * 100.0 / row['attempts'])
+        for question_id, row in counts.items()
+    ])
+
+
+def _raw_student_stats():
+    """Agregados por estudiante calculados directamente desde results"""
+    timed = func.sum(case((func.coalesce(Result.time_spent, 0) != 0, 1), else_=0))
+    rows = db.session.query(
+        Result.student_id,
+        func.count(Result.id),
+        func.sum(Result.percentage),
+        func.coalesce(func.sum(Result.time_spent), 0),
+        timed
+    ).group_by(Result.student_id).all()
+
+    recent = {}
+    position = func.row_number().over(
+        partition_by=Result.student_id,
+        order_by=(Result.completed_at.desc(), Result.id.desc())
+    ).label('position')
+    ranked = db.session.query(Result.student_id, Result.percentage, position).subquery()
+    for student_id, percentage, _ in db.session.query(ranked).filter(
+        ranked.c.position <= RECENT_WINDOW
+    ).order_by(ranked.c.student_id, ranked.c.position):
+        recent.setdefault(student_id, []).append(percentage)
+
+    return {
+        student_id: {
+            'attempts': attempts,
+            'percentage_sum': percentage_sum,
+            'time_spent_sum': time_spent_sum,
+            'timed_attempts': timed_attempts,
+            'recent_scores': recent.get(student_id, [])
+        }
+        for student_id, attempts, percentage_sum, time_spent_sum, timed_attempts in rows
+    }
+
+
+def _raw_activity_stats():
+    """Agregados por actividad calculados directamente desde results"""
+    timed = func.sum(case((func.coalesce(Result.time_spent, 0) != 0, 1), else_=0))
+    rows = db.session.query(
+        Result.activity_id,
+        func.count(Result.id),
+        func.sum(case((Result.percentage >= PASSING_PERCENTAGE, 1), else_=0)),
+        func.sum(Result.percentage),
+        func.coalesce(func.sum(Result.time_spent), 0),
+        timed
+    ).group_by(Result.activity_id).all()
+
+    return {
+        activity_id: {
+            'attempts': attempts,
+            'pass_count': pass_count,
+            'percentage_sum': percentage_sum,
+            'time_spent_sum': time_spent_sum,
+            'timed_attempts': timed_attempts
+        }
+        for activity_id, attempts, pass_count, percentage_sum, time_spent_sum, timed_attempts in rows
+    }
+
+
+def _raw_question_stats():
+    """Agregados por pregunta decodificando los vectores de respuestas de results"""
+    keys = {}
+    for question_id, activity_id, correct_answer in db.session.query(
+        Question.id, Question.activity_id, Question.correct_answer
+    ).order_by(Question.id):
+        keys.setdefault(activity_id, {})[question_id] = correct_answer.lower()
+
+    counts = {}
+    rows = db.session.query(Result.activity_id, Result.answers).filter(
+        Result.answers.isnot(None)
+    ).order_by(Result.activity_id).yield_per(10000)
+    current, question_ids, correct_codes = None, [], []
+    for activity_id, packed in rows:
+        if activity_id != current:
+            current = activity_id
+            answers = keys.get(activity_id, {})
+            question_ids = sorted(answers)
+            correct_codes = _correct_codes(answers, question_ids)
+        _count_answers(counts, activity_id, question_ids, correct_codes, packed)
+
+    for row in counts.values():
+        row['percent_correct'] = row['correct'] * 100.0 / row['attempts']
+    return counts
+
+
+FEATURE_FIELDS = ['attempts', 'ewma_score', 'trend', 'time_per_point', 'subject_scores', 'difficulty_scores']
+
+
+def _raw_student_features():
+    """Vectores de características reproduciendo los resultados en orden cronológico"""
+    rows = db.session.query(
+        Result.student_id, Result.percentage, Result.time_spent, Result.max_score,
+        Activity.subject, Activity.difficulty
+    ).join(Activity, Activity.id == Result.activity_id).order_by(
+        Result.student_id, Result.completed_at, Result.id
+    ).yield_per(10000)
+
+    features = {}
+    for student_id, percentage, time_spent, max_score, subject, difficulty in rows:
+        vector = features.get(student_id)
+        if vector is None:
+            vector = features[student_id] = new_features(student_id)
+        apply_result(vector, percentage, time_spent, max_score, subject, difficulty)
+    return {
+        student_id: {field: getattr(vector, field) for field in FEATURE_FIELDS}
+        for student_id, vector in features.items()
+    }
+
+
+def rebuild_stats():
+    """Recalcula desde cero las tablas de resumen a partir de results"""
+    students = _raw_student_stats()
+    activities = _raw_activity_stats()
+    questions = _raw_question_stats()
+    features = _raw_student_features()
+
+    db.session.query(StudentStats).delete()
+    db.session.query(StudentFeatures).delete()
+    db.session.query(ActivityStats).delete()
+    db.session.query(QuestionStats).delete()
+    if students:
+        db.session.execute(StudentStats.__table__.insert(), [
+            dict(values, student_id=student_id) for student_id, values in students.items()
+        ])
+    if activities:
+        db.session.execute(ActivityStats.__table__.insert(), [
+            dict(values, activity_id=activity_id) for activity_id, values in activities.items()
+        ])
+    if features:
+        db.session.execute(StudentFeatures.__table__.insert(), [
+            dict(values, student_id=student_id) for student_id, values in features.items()
+        ])
+    if questions:
+        db.session.execute(QuestionStats.__table__.insert(), [
+            dict(values, question_id=question_id) for question_id, values in questions.items()
+        ])
+    db.session.commit()
+
+    return len(students), len(activities), len(questions)
+
+
+def _compare(expected, rows, key, fields):
+    errors = []
+    stored = {getattr(row, key): row for row in rows}
+    for item_id in sorted(set(expected) | set(stored)):
+        raw = expected.get(item_id)
+        row = stored.get(item_id)
+        if raw is None or row is None:
+            errors.append(f'{key}={item_id}: falta en {"results" if raw is None else "el resumen"}')
+            continue
+        for field in fields:
+            value = getattr(row, field)
+            if isinstance(raw[field], list):
+                matches = [round(v, 6) for v in value or []] == [round(v, 6) for v in raw[field]]
+            elif isinstance(raw[field], dict):
+                matches = ({k: round(v, 6) for k, v in (value or {}).items()}
+                           == {k: round(v, 6) for k, v in raw[field].items()})
+            elif isinstance(raw[field], float) or isinstance(value, float):
+                matches = abs((value or 0) - (raw[field] or 0)) < 1e-6
+            else:
+                matches = value == raw[field]
+            if not matches:
+                errors.append(f'{key}={item_id}: {field} = {value}, esperado {raw[field]}')
+    return errors
+
+
+def verify_stats():
+    """Compara los resúmenes con los resultados originales y devuelve las diferencias"""
+    errors = _compare(
+        _raw_student_stats(), StudentStats.query.all(), 'student_id',
+        ['attempts', 'percentage_sum', 'time_spent_sum', 'timed_attempts', 'recent_scores']
+    )
+    errors += _compare(
+        _raw_activity_stats(), ActivityStats.query.all(), 'activity_id',
+        ['attempts', 'pass_count', 'percentage_sum', 'time_spent_sum', 'timed_attempts']
+    )
+    errors += _compare(
+        _raw_question_stats(), QuestionStats.query.all(), 'question_id',
+        ['activity_id'] + QUESTION_COUNTERS + ['percent_correct']
+    )
+    errors += _compare(_raw_student_features(), StudentFeatures.query.all(), 'student_id', FEATURE_FIELDS)
+    return errors
+
+
+def ensure_stats():
+    """Reconstruye los resúmenes si están vacíos pero ya existen resultados"""
+    if StudentStats.query.first() is None and Result.query.first() is not None:
+        rebuild_stats()
+    elif StudentFeatures.query.first() is None and Result.query.first() is not None:
+        rebuild_stats()
+    elif QuestionStats.query.first() is None and Result.query.filter(Result.answers.isnot(None)).first() is not None:
+        rebuild_stats()
@@ -0,0 +1,288 @@
+import atexit
+import glob
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+from app.models import Result
+from app import db, cache
+from app.stats import record_result, record_answers
+from app.logic import result_cache_keys
+from app.jobs import job_runner
+
+RESULT_FIELDS = ['student_id', 'activity_id', 'score', 'max_score', 'percentage', 'time_spent', 'attempts',
+                 'completed_at', 'answers', 'submission_id']
+# Reintentos de un lote antes de descartarlo (queda registrado en el log)
+FLUSH_RETRIES = 3
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _dump_entry(entry):
+    """Resultado encolado en formato JSON (spool y log de descartes)"""
+    answers = entry.get('answers')
+    return dict(entry, completed_at=entry['completed_at'].isoformat(),
+                answers=answers.hex() if answers is not None else None)
+
+
+def _load_entry(data):
+    data['completed_at'] = datetime.fromisoformat(data['completed_at'])
+    answers = data.get('answers')
+    data['answers'] = bytes.fromhex(answers) if answers is not None else None
+    return data
+
+
+class ResultWriter:
+    """Escritura diferida de resultados (write-behind).
+
+    Con RESULT_WRITE_MODE = 'buffered' los resultados calificados se encolan en
+    memoria y un hilo los guarda en transacciones por lotes, al juntar
+    RESULT_BATCH_SIZE resultados o cada RESULT_FLUSH_INTERVAL segundos. Así un
+    pico de envíos no paga un commit (y un fsync) por estudiante.
+
+    RESULT_DURABILITY decide qué pasa si el proceso muere antes del commit:
+    - 'memory': se pierden los resultados todavía en cola.
+    - 'spool': cada resultado se anota antes en un archivo local que se
+      vuelve a aplicar al arrancar; sobrevive a la caída del proceso, no a
+      la del sistema operativo.
+    Con RESULT_WRITE_MODE = 'sync' (por defecto) cada envío hace su propio commit.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.app = None
+        self._queue = queue.Queue()
+        self._pending = {}  # id de estudiante -> resultados encolados sin guardar
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._spool = None
+        self._atexit_registered = False
+        self.flushed = 0
+        self.batches = 0
+        self.dropped = 0
+
+    def init_app(self, app):
+        if self._thread is not None:
+            self.stop()
+        self.enabled = app.config.get('RESULT_WRITE_MODE', 'sync') == 'buffered'
+        if not self.enabled:
+            return
+        self.app = app
+        self.batch_size = app.config.get('RESULT_BATCH_SIZE', 100)
+        self.flush_interval = app.config.get('RESULT_FLUSH_INTERVAL', 0.5)
+        self.durability = app.config.get('RESULT_DURABILITY', 'memory')
+        if self.durability not in ('memory', 'spool'):
+            raise ValueError(f'RESULT_DURABILITY desconocido: {self.durability}')
+
+        if self.durability == 'spool':
+            self.spool_dir = app.config['RESULT_SPOOL_DIR']
+            os.makedirs(self.spool_dir, exist_ok=True)
+            self._replay_spools()
+            self._spool_path = os.path.join(self.spool_dir, f'results-{os.getpid()}.jsonl')
+            self._spool = open(self._spool_path, 'a', encoding='utf-8')
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='result-writer', daemon=True)
+        self._thread.start()
+        if not self._atexit_registered:
+            atexit.register(self.stop)
+            self._atexit_registered = True
+        app.extensions['result_writer'] = self
+
+    # --- Encolar y leer ---
+
+    def submit(self, **values):
+        """Encola un resultado ya calificado y lo devuelve como dict"""
+        values.setdefault('completed_at', datetime.utcnow())
+        values.setdefault('submission_id', uuid.uuid4().hex)
+        entry = {field: values.get(field) for field in RESULT_FIELDS}
+        with self._lock:
+            if self._spool is not None:
+                self._spool.write(json.dumps(_dump_entry(entry)) + '\n')
+                self._spool.flush()
+            self._pending.setdefault(entry['student_id'], []).append(entry)
+        self._queue.put(entry)
+        return entry
+
+    def pending_for(self, student_id):
+        """Resultados del estudiante que todavía no llegaron a la base de datos.
+
+        Solo ve la cola de este proceso: con varios workers, un envío recién
+        aceptado por otro worker no aparece hasta que ese worker lo guarda
+        (a lo sumo RESULT_FLUSH_INTERVAL segundos después).
+        """
+        with self._lock:
+            return list(self._pending.get(student_id, []))
+
+    # --- Hilo escritor ---
+
+    def _run(self):
+        while not self._stop.is_set() or not self._queue.empty():
+            batch = self._collect()
+            if batch:
+                self._flush(batch)
+
+    def _collect(self):
+        """Junta hasta batch_size resultados o los que lleguen en flush_interval"""
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _flush(self, batch):
+        written = False
+        for attempt in range(1, FLUSH_RETRIES + 1):
+            try:
+                # Al salir del contexto la sesión se descarta, y se deshace si falló
+                with self.app.app_context():
+                    keys = self._write(batch)
+                written = True
+                break
+            except Exception:
+                self.app.logger.exception('Fallo al guardar %d resultados (intento %d)', len(batch), attempt)
+                time.sleep(self.flush_interval * attempt)
+        if written:
+            self.flushed += len(batch)
+            self.batches += 1
+            self._invalidate(keys)
+        else:
+            self.dropped += len(batch)
+            self.app.logger.error('Se descartan %d resultados: %s', len(batch), json.dumps(
+                [_dump_entry(entry) for entry in batch]
+            ))
+
+        with self._lock:
+            for entry in batch:
+                pending = self._pending.get(entry['student_id'], [])
+                pending[:] = [e for e in pending if e is not entry]
+                if not pending:
+                    self._pending.pop(entry['student_id'], None)
+            if self._spool is not None:
+                self._compact_spool()
+
+    def _compact_spool(self):
+        """Deja en el spool solo los resultados pendientes (se llama con el lock tomado).
+
+        Así no crece sin límite con carga continua y, tras una caída, no
+        contiene lotes ya guardados.
+        """
+        if not self._pending:
+            # Todo lo anotado ya está en la base de datos (o en el log si se descartó)
+            self._spool.truncate(0)
+            return
+        temporary = f'{self._spool_path}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as f:
+            for entries in self._pending.values():
+                for entry in entries:
+                    f.write(json.dumps(_dump_entry(entry)) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self._spool.close()
+        os.replace(temporary, self._spool_path)
+        self._spool = open(self._spool_path, 'a', encoding='utf-8')
+
+    def _write(self, batch):
+        """Inserta un lote y actualiza los resúmenes en una sola transacción.
+
+        Los resultados cuyo submission_id ya está guardado se omiten, así que
+        volver a aplicar un lote (reintento o spool tras una caída) no los
+        duplica. Devuelve las claves de caché afectadas.
+        """
+        ids = [entry['submission_id'] for entry in batch if entry.get('submission_id')]
+        saved = {submission_id for (submission_id,) in db.session.query(Result.submission_id).filter(
+            Result.submission_id.in_(ids))} if ids else set()
+        results = []
+        for entry in batch:
+            if entry.get('submission_id') in saved:
+                continue
+            # Los spools anteriores a la tabla de intentos no traen el número
+            result = Result(**dict(entry, attempts=entry.get('attempts') or 1))
+            db.session.add(result)
+            record_result(result)
+            # record_result asigna expresiones SQL: hay que enviarlas antes del
+            # siguiente resultado del mismo estudiante o actividad
+            db.session.flush()
+            results.append(result)
+        record_answers(results)
+        db.session.commit()
+
+        keys = set()
+        for result in {r.student_id: r for r in results}.values():
+            keys.update(result_cache_keys(result))
+        for activity_id in {r.activity_id for r in results}:
+            keys.update([f'activity_stats:{activity_id}', f'question_analysis:{activity_id}'])
+        return keys
+
+    def _invalidate(self, keys):
+        """Invalida la caché y programa los snapshots de un lote ya guardado.
+
+        Va fuera de los reintentos de _flush: si falla, el lote no se vuelve a
+        insertar; la caché se corrige sola al vencer el TTL.
+        """
+        try:
+            with self.app.app_context():
+                cache.delete(*keys)
+                job_runner.refresh(keys)
+        except Exception:
+            self.app.logger.exception('Fallo al invalidar la caché tras guardar un lote')
+
+    # --- Arranque y cierre ---
+
+    def _replay_spools(self):
+        """Aplica los archivos de procesos anteriores que terminaron sin vaciar su cola"""
+        for path in glob.glob(os.path.join(self.spool_dir, 'results-*.jsonl')):
+            pid = int(os.path.basename(path)[len('results-'):-len('.jsonl')])
+            if pid != os.getpid() and _pid_alive(pid):
+                continue
+            with open(path, encoding='utf-8') as f:
+                entries = [_load_entry(json.loads(line)) for line in f if line.strip()]
+            if entries:
+                with self.app.app_context():
+                    keys = self._write(entries)
+                self._invalidate(keys)
+                self.app.logger.warning('Recuperados %d resultados de %s', len(entries), path)
+            os.remove(path)
+
+    def flush(self):
+        """Espera a que la cola quede vacía (útil en pruebas y benchmarks)"""
+        while self.enabled and (not self._queue.empty() or self.pending_count()):
+            time.sleep(self.flush_interval / 10)
+
+    def pending_count(self):
+        with self._lock:
+            return sum(len(entries) for entries in self._pending.values())
+
+    def stop(self):
+        """Vacía la cola y detiene el hilo; se ejecuta también al salir del proceso"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+            if os.path.exists(self._spool_path) and os.path.getsize(self._spool_path) == 0:
+                os.remove(self._spool_path)
+
+
+result_writer = ResultWriter()
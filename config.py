@@ -12,4 +12,110 @@ class Config:
     # Configuración de archivos subidos
     UPLOAD_FOLDER = os.path.join(BASEDIR, 'app', 'static', 'uploads')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16 MB máximo
-    ALLOWED_EXTENSIONS = {'pdf', 'txt', 'doc', 'docx'}
\ No newline at end of file
+    ALLOWED_EXTENSIONS = {'pdf', 'txt', 'doc', 'docx', 'csv', 'json', 'jsonl'}
+    
+    # Caché compartida entre peticiones: 'memory' (por proceso), 'sqlite' (entre workers) o 'null'
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND') or 'memory'
+    CACHE_MAX_ENTRIES = 1024
+    CACHE_DEFAULT_TTL = 60  # segundos
+    CACHE_SQLITE_PATH = os.path.join(BASEDIR, 'instance', 'cache.db')
+    
+    # Paginación por cursor (keyset) de listados
+    PAGE_SIZE = 50
+    MAX_PAGE_SIZE = 200
+    
+    # Instrumentación de peticiones (Server-Timing, log por petición y /admin/metrics)
+    PROFILING_ENABLED = os.environ.get('PROFILING') == '1'
+    SLOW_QUERY_THRESHOLD_MS = 100
+    METRICS_WINDOW = 1000  # peticiones recientes por endpoint
+    
+    # Guardado de resultados: 'sync' (un commit por envío) o 'buffered' (lotes en segundo plano)
+    RESULT_WRITE_MODE = os.environ.get('RESULT_WRITE_MODE') or 'sync'
+    RESULT_BATCH_SIZE = 100
+    RESULT_FLUSH_INTERVAL = 0.5  # segundos máximos que un resultado espera en la cola
+    RESULT_DURABILITY = 'spool'  # 'memory': se pierde la cola si el proceso muere; 'spool': se anota en disco
+    RESULT_SPOOL_DIR = os.path.join(BASEDIR, 'instance', 'spool')
+    
+    # Tareas en segundo plano (snapshots de paneles) con la tabla jobs como cola
+    JOBS_ENABLED = os.environ.get('JOBS') == '1'
+    JOB_WORKERS = 2
+    JOB_POLL_INTERVAL = 1.0  # segundos entre búsquedas de tareas pendientes
+    JOB_SCHEDULE_INTERVAL = 300  # segundos entre recálculos completos
+    JOB_RETENTION = 86400  # segundos que se conservan las tareas terminadas
+    JOB_LEASE_TIMEOUT = 900  # segundos tras los que una tarea 'running' se da por abandonada
+    
+    # PRAGMA aplicados a cada conexión SQLite nueva (vacío: valores por defecto de SQLite)
+    SQLITE_PRAGMAS = {}
+    
+    # Hash de contraseñas en formato de werkzeug con el costo explícito; al cambiarlo
+    # cada usuario se vuelve a hashear en su siguiente inicio de sesión
+    PASSWORD_HASH_METHOD = 'scrypt:16384:8:1'
+    PASSWORD_HASH_WORKERS = os.cpu_count() or 2  # hashes simultáneos como máximo
+    PASSWORD_HASH_TIMEOUT = 5  # segundos esperando un hilo libre antes de responder 503
+    
+    # Presupuesto de intentos fallidos de inicio de sesión (en memoria, por proceso)
+    LOGIN_THROTTLE_ENABLED = True
+    LOGIN_MAX_FAILURES_PER_USER = 5
+    LOGIN_MAX_FAILURES_PER_IP = 100  # alto: un colegio entero puede salir por la misma IP
+    LOGIN_FAILURE_WINDOW = 300  # segundos
+    LOGIN_THROTTLE_MAX_KEYS = 10000
+    
+    # Identidades (id, nombre, rol) de usuarios autenticados cacheadas en el proceso
+    IDENTITY_CACHE_SIZE = 4096
+    IDENTITY_CACHE_TTL = 60  # segundos que otro proceso puede tardar en ver un cambio de rol o un borrado
+    
+    # Páginas de examen renderizadas por versión de actividad (None: solo en memoria)
+    EXAM_FRAGMENT_CACHE_SIZE = 256
+    EXAM_FRAGMENT_DIR = None
+    # Orden de preguntas y opciones distinto en cada intento (semilla en la tabla attempts)
+    EXAM_SHUFFLE = True
+    
+    # Segundos tras los que un intento abierto vence: reabrir el examen empieza
+    # otro y el barrido periódico (JOBS_ENABLED) lo marca vencido
+    ATTEMPT_MAX_AGE = 3 * 3600
+    ATTEMPT_SWEEP_BATCH = 500
+
+
+class ProductionConfig(Config):
+    """Perfil para servir con varios hilos (waitress, gunicorn --threads, etc.)"""
+    
+    # WAL permite lecturas simultáneas a una escritura; con synchronous=NORMAL
+    # solo se sincroniza el disco en los checkpoints, sin riesgo de corrupción.
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,  # ms esperando el bloqueo de escritura antes de "database is locked"
+        'cache_size': -64000,  # 64 MB de caché de páginas por conexión
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'foreign_keys': 'ON'
+    }
+    
+    # Un pool de conexiones reutilizables, una por hilo del servidor WSGI.
+    # Las conexiones pasan de un hilo a otro a través del pool, por eso
+    # check_same_thread=False; cada una la usa un solo hilo a la vez.
+    WSGI_THREADS = int(os.environ.get('WSGI_THREADS') or 8)
+    
+    # Páginas de examen también en disco: sobreviven a reinicios y se comparten entre procesos
+    EXAM_FRAGMENT_DIR = os.path.join(Config.BASEDIR, 'instance', 'fragments')
+    
+    # scrypt con el doble de memoria y costo que en desarrollo
+    PASSWORD_HASH_METHOD = 'scrypt:32768:8:1'
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': WSGI_THREADS,
+        'max_overflow': 4,
+        'pool_timeout': 10,
+        'pool_recycle': 3600,
+        'connect_args': {'check_same_thread': False, 'timeout': 5}
+    }
+
+
+# Perfiles seleccionables con la variable de entorno APP_CONFIG
+CONFIGS = {
+    'development': Config,
+    'production': ProductionConfig
+}
+
+
+def get_config(name=None):
+    return CONFIGS[name or os.environ.get('APP_CONFIG') or 'development']
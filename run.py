@@ -1,11 +1,15 @@
-from app import create_app, db
+from app import create_app
 from app.models import User, Activity, Question, Result
+from app.schema import upgrade_schema
+from app.stats import ensure_stats
+from config import get_config
 
-app = create_app()
+app = create_app(get_config())
 
-# Crear las tablas si no existen
+# Crear las tablas e índices que falten sin borrar datos
 with app.app_context():
-    db.create_all()
+    upgrade_schema()
+    ensure_stats()
     print("Base de datos inicializada correctamente")
 
 if __name__ == '__main__':
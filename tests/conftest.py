@@ -0,0 +1,89 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Permite ejecutar pytest desde la raíz del proyecto sin instalarlo.
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from config import Config
+from app import create_app, db
+from app.models import User, Activity, Question
+from app.schema import upgrade_schema
+from app.seeding import SeedParams, seed, PASSWORDS
+from app.stats import rebuild_stats
+from app.writebehind import result_writer
+
+
+def make_app(tmp_path, seeded=True, **settings):
+    """Aplicación sobre una base sintética pequeña en tmp_path.
+
+    `settings` sobrescribe la configuración; con seeded=False se reutiliza la
+    base que ya exista (p. ej. para simular un reinicio).
+    """
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + str(tmp_path / 'test.db')
+        WTF_CSRF_ENABLED = False
+        TESTING = True
+        # Sin caché: los presupuestos de consultas miden el peor caso
+        CACHE_BACKEND = 'null'
+        PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+        EXAM_FRAGMENT_DIR = None
+
+    for name, value in settings.items():
+        setattr(TestConfig, name, value)
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        upgrade_schema()
+        if seeded:
+            seed(SeedParams(teachers=2, students=30, activities=3, questions=5, results=4, seed=7),
+                 log=lambda message: None)
+            rebuild_stats()
+    return app
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = make_app(tmp_path)
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+@pytest.fixture
+def buffered_app(tmp_path):
+    """Con escritura diferida de resultados y spool en disco"""
+    app = make_app(tmp_path, RESULT_WRITE_MODE='buffered', RESULT_DURABILITY='spool',
+                   RESULT_FLUSH_INTERVAL=0.05, RESULT_SPOOL_DIR=str(tmp_path / 'spool'))
+    yield app
+    result_writer.stop()
+    with app.app_context():
+        db.engine.dispose()
+
+
+@pytest.fixture
+def targets(app):
+    return pick_targets(app)
+
+
+def pick_targets(app):
+    """Un docente, una de sus actividades con preguntas y algunos estudiantes"""
+    with app.app_context():
+        activity = Activity.query.join(Question).order_by(Activity.id).first()
+        teacher = db.session.get(User, activity.teacher_id)
+        students = [username for (username,) in db.session.query(User.username).filter_by(
+            role='student').order_by(User.id).limit(6)]
+        return {'teacher': teacher.username, 'student': students[0], 'students': students,
+                'activity_id': activity.id,
+                'question_ids': [q.id for q in Question.query.filter_by(activity_id=activity.id)]}
+
+
+def login(app, username):
+    client = app.test_client()
+    password = PASSWORDS['teacher'] if username.startswith('docente') else PASSWORDS['student']
+    response = client.post('/login', data={'username': username, 'password': password})
+    assert response.status_code == 302, response.status_code
+    return client
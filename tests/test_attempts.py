@@ -0,0 +1,34 @@
+"""Intentos de examen: un envío solo cierra el último intento abierto o vencido"""
+from datetime import timedelta
+
+from app import db
+from app.models import Attempt, Result
+from conftest import login
+
+
+def test_repost_after_expire_and_reopen_is_rejected(app, targets):
+    client = login(app, targets['student'])
+    activity_id = targets['activity_id']
+    url = f'/student/activity/{activity_id}'
+    answers = {f'question_{question_id}': 'a' for question_id in targets['question_ids']}
+
+    # Intento A abierto y vencido por antigüedad; reabrir el examen crea B
+    assert client.get(url).status_code == 200
+    with app.app_context():
+        first = Attempt.query.filter_by(activity_id=activity_id, status='open').one()
+        first.started_at -= timedelta(seconds=app.config['ATTEMPT_MAX_AGE'] + 60)
+        db.session.commit()
+    assert client.get(url).status_code == 200
+    with app.app_context():
+        assert Attempt.query.filter_by(activity_id=activity_id, status='expired').count() == 1
+
+    assert client.post(url, data=answers).status_code == 302
+    with app.app_context():
+        results = Result.query.count()
+
+    # Reenviar el mismo formulario no puede cerrar A con su semilla
+    response = client.post(url, data=answers, follow_redirects=True)
+    assert 'ya fue enviado' in response.data.decode()
+    with app.app_context():
+        assert Result.query.count() == results
+        assert Attempt.query.filter_by(activity_id=activity_id, status='expired').count() == 1
@@ -0,0 +1,18 @@
+"""Exportación de resultados por fragmentos"""
+from app.export import EXPORT_FIELDS, stream_csv
+
+
+def test_csv_header_is_sent_before_reading_rows():
+    def rows():
+        raise AssertionError('se leyó una fila antes de enviar el encabezado')
+        yield
+
+    chunks = stream_csv(rows())
+    assert next(chunks) == ','.join(EXPORT_FIELDS) + '\r\n'
+
+
+def test_csv_rows_are_batched_after_the_header():
+    rows = [[index] + [''] * (len(EXPORT_FIELDS) - 1) for index in range(5)]
+    chunks = list(stream_csv(iter(rows), batch_size=2))
+    assert len(chunks) == 4
+    assert [chunk.count('\r\n') for chunk in chunks] == [1, 2, 2, 1]
@@ -0,0 +1,60 @@
+"""Calificación de exámenes con preguntas y opciones barajadas por intento"""
+from app import db
+from app.grading import CHOICES, AnswerKey, exam_order
+from app.models import Attempt, Question, Result
+from conftest import login
+
+
+def shown_answers(seed, answers, pick):
+    """Formulario como lo enviaría el navegador: la posición mostrada de la opción elegida"""
+    order, options = exam_order(seed, answers)
+    return {f'question_{question_id}': CHOICES[options[question_id].index(pick(question_id))]
+            for question_id in order}
+
+
+def test_exam_order_is_a_reproducible_permutation():
+    question_ids = [5, 2, 9, 7]
+    order, options = exam_order(1234, question_ids)
+    assert sorted(order) == sorted(question_ids)
+    assert all(sorted(permutation) == list(CHOICES) for permutation in options.values())
+    assert exam_order(1234, list(reversed(question_ids))) == (order, options)
+    assert exam_order(None, question_ids) == (sorted(question_ids), {q: CHOICES for q in question_ids})
+
+
+def test_grade_maps_shuffled_options_back_to_the_key():
+    key = AnswerKey(1, {10: ('a', 2), 11: ('c', 3), 12: ('d', 1)})
+    # Una semilla que mueve de lugar alguna respuesta correcta
+    seed = next(seed for seed in range(100) if any(
+        options.index(key.answers[question_id][0]) != CHOICES.index(key.answers[question_id][0])
+        for question_id, options in exam_order(seed, key.answers)[1].items()
+    ))
+
+    correct = shown_answers(seed, key.answers, lambda question_id: key.answers[question_id][0])
+    score, packed = key.grade(correct, seed)
+    assert score == key.max_score
+    assert list(packed) == [CHOICES.index(key.answers[q][0]) + 1 for q in key.question_ids]
+
+    # La respuesta correcta solo en la pregunta 11; las demás eligen 'b'
+    mixed = shown_answers(seed, key.answers, lambda question_id: 'c' if question_id == 11 else 'b')
+    assert key.grade(mixed, seed)[0] == 3
+    # Sin traducir con la semilla el mismo formulario no obtiene el puntaje completo
+    assert key.grade(correct, None)[0] < key.max_score
+
+
+def test_submission_is_graded_in_the_order_it_was_shown(app, targets):
+    client = login(app, targets['student'])
+    activity_id = targets['activity_id']
+    assert client.get(f'/student/activity/{activity_id}').status_code == 200
+    with app.app_context():
+        seed = Attempt.query.filter_by(activity_id=activity_id, status='open').one().seed
+        answers = {q.id: (q.correct_answer.lower(), q.points)
+                   for q in Question.query.filter_by(activity_id=activity_id)}
+        previous = db.session.query(db.func.max(Result.id)).scalar()
+    assert seed is not None
+
+    form = shown_answers(seed, answers, lambda question_id: answers[question_id][0])
+    assert client.post(f'/student/activity/{activity_id}', data=form).status_code == 302
+    with app.app_context():
+        result = Result.query.filter(Result.id > previous).one()
+        assert result.score == result.max_score == sum(points for _, points in answers.values())
+        assert result.percentage == 100
@@ -0,0 +1,24 @@
+"""Importación de bancos de preguntas"""
+import io
+import json
+
+from app.importer import import_questions
+from app.models import Question
+
+
+def question(text):
+    return {'question_text': text, 'option_a': '1', 'option_b': '2', 'option_c': '3', 'option_d': '4',
+            'correct_answer': 'b', 'points': 1}
+
+
+def test_jsonl_reports_malformed_lines_and_keeps_going(app, targets):
+    lines = [json.dumps(question('¿1 + 1?')), '{"question_text": "sin cerrar"', '',
+             json.dumps(question('¿4 / 2?')), json.dumps({'question_text': 'incompleta'})]
+    stream = io.StringIO('\n'.join(lines) + '\n')
+    with app.app_context():
+        before = Question.query.filter_by(activity_id=targets['activity_id']).count()
+        report = import_questions(targets['activity_id'], stream, 'jsonl')
+        after = Question.query.filter_by(activity_id=targets['activity_id']).count()
+    assert report.inserted == 2 and after == before + 2
+    assert [number for number, _ in report.errors] == [2, 5]
+    assert report.errors[0][1].startswith('JSON inválido')
@@ -0,0 +1,38 @@
+"""Presupuestos de consultas SQL por ruta: detectan regresiones N+1.
+
+Cada prueba usa una aplicación nueva, así que los límites incluyen la carga
+del usuario en la caché de identidades. No dependen del tamaño de los datos;
+si un cambio los supera, revisar el listado de sentencias del mensaje de
+error antes de subirlos.
+"""
+import pytest
+
+from app.instrumentation import assert_max_queries
+from conftest import login
+
+ROUTE_BUDGETS = [
+    ('student', '/student/dashboard', 12),
+    ('teacher', '/teacher/dashboard', 7),
+    ('teacher', '/teacher/students', 4),
+    ('teacher', '/teacher/activity/{activity_id}/stats', 7),
+    ('student', '/student/activity/{activity_id}', 7),
+]
+SUBMIT_BUDGET = 18
+
+
+@pytest.mark.parametrize('role, url, limit', ROUTE_BUDGETS)
+def test_route_query_budget(app, targets, role, url, limit):
+    client = login(app, targets[role])
+    with app.app_context(), assert_max_queries(limit):
+        response = client.get(url.format(**targets))
+    assert response.status_code == 200
+
+
+def test_submit_query_budget(app, targets):
+    client = login(app, targets['student'])
+    activity_id = targets['activity_id']
+    assert client.get(f'/student/activity/{activity_id}').status_code == 200
+    answers = {f'question_{question_id}': 'a' for question_id in targets['question_ids']}
+    with app.app_context(), assert_max_queries(SUBMIT_BUDGET):
+        response = client.post(f'/student/activity/{activity_id}', data=answers)
+    assert response.status_code == 302
@@ -0,0 +1,23 @@
+"""Las consultas frecuentes de app/schema.py usan su índice y no recorren tablas completas"""
+from app import db
+from app.schema import OBSOLETE_INDEXES, check_query_plans, upgrade_schema
+
+
+def test_hot_queries_use_their_indexes(app):
+    with app.app_context():
+        report = check_query_plans()
+    assert report
+    for name, ok, plan in report:
+        assert ok, f'{name}: {plan}'
+        full_scans = [line for line in plan if line.startswith('SCAN ')]
+        assert not full_scans, f'{name} recorre la tabla completa: {full_scans}'
+
+
+def test_upgrade_drops_obsolete_indexes(app):
+    with app.app_context():
+        with db.engine.begin() as connection:
+            for name in OBSOLETE_INDEXES:
+                connection.exec_driver_sql(f'CREATE INDEX {name} ON results (activity_id, percentage)')
+        upgrade_schema()
+        existing = {index['name'] for index in db.inspect(db.engine).get_indexes('results')}
+    assert not existing & set(OBSOLETE_INDEXES)
@@ -0,0 +1,32 @@
+"""Los resúmenes incrementales coinciden con un recálculo completo desde results"""
+import pytest
+
+from app.models import Result
+from app.stats import verify_stats
+from app.writebehind import result_writer
+from conftest import login, pick_targets
+
+
+def submit_all(app, targets):
+    """Cada estudiante de la muestra abre el examen y lo envía con respuestas variadas"""
+    activity_id = targets['activity_id']
+    for index, username in enumerate(targets['students']):
+        client = login(app, username)
+        assert client.get(f'/student/activity/{activity_id}').status_code == 200
+        answers = {f'question_{question_id}': 'abcd'[(index + position) % 4]
+                   for position, question_id in enumerate(targets['question_ids'])
+                   if (index + position) % 5}  # algunas preguntas en blanco
+        assert client.post(f'/student/activity/{activity_id}', data=answers).status_code == 302
+
+
+@pytest.mark.parametrize('fixture', ['app', 'buffered_app'])
+def test_summaries_match_recompute(request, fixture):
+    app = request.getfixturevalue(fixture)
+    targets = pick_targets(app)
+    with app.app_context():
+        before = Result.query.count()
+    submit_all(app, targets)
+    result_writer.flush()
+    with app.app_context():
+        assert Result.query.count() == before + len(targets['students'])
+        assert verify_stats() == []
@@ -0,0 +1,78 @@
+"""Escritura diferida: reintentos idempotentes, recuperación del spool y compactación"""
+import json
+import os
+import uuid
+from datetime import datetime
+
+from app import db
+from app.models import Result, User
+from app.stats import verify_stats
+from app.writebehind import result_writer, _dump_entry
+from conftest import make_app, pick_targets
+
+DEAD_PID = 999999
+
+
+def make_entry(app, targets, index=0):
+    """Resultado calificado como los que encola la ruta de envío"""
+    with app.app_context():
+        student_id = User.query.filter_by(username=targets['students'][index]).one().id
+    questions = len(targets['question_ids'])
+    return {
+        'student_id': student_id, 'activity_id': targets['activity_id'], 'score': 1.0,
+        'max_score': float(questions), 'percentage': 100.0 / questions, 'time_spent': 60, 'attempts': 1,
+        'completed_at': datetime.utcnow(), 'answers': bytes([1] + [2] * (questions - 1)),
+        'submission_id': uuid.uuid4().hex
+    }
+
+
+def test_write_is_idempotent_on_submission_id(buffered_app):
+    targets = pick_targets(buffered_app)
+    batch = [make_entry(buffered_app, targets, index) for index in range(2)]
+    with buffered_app.app_context():
+        before = Result.query.count()
+        result_writer._write([dict(entry) for entry in batch])
+        result_writer._write([dict(entry) for entry in batch])
+        assert Result.query.count() == before + 2
+        assert verify_stats() == []
+
+
+def test_spool_of_dead_process_is_replayed_once(buffered_app, tmp_path):
+    targets = pick_targets(buffered_app)
+    committed, lost = make_entry(buffered_app, targets, 0), make_entry(buffered_app, targets, 1)
+    with buffered_app.app_context():
+        result_writer._write([dict(committed)])
+        before = Result.query.count()
+    result_writer.stop()
+
+    # El proceso murió con un resultado ya guardado y otro todavía en el spool
+    spool = tmp_path / 'spool' / f'results-{DEAD_PID}.jsonl'
+    spool.write_text(''.join(json.dumps(_dump_entry(entry)) + '\n' for entry in (committed, lost)))
+
+    restarted = make_app(tmp_path, seeded=False, RESULT_WRITE_MODE='buffered', RESULT_DURABILITY='spool',
+                         RESULT_FLUSH_INTERVAL=0.05, RESULT_SPOOL_DIR=str(tmp_path / 'spool'))
+    with restarted.app_context():
+        assert Result.query.count() == before + 1
+        assert Result.query.filter_by(submission_id=lost['submission_id']).count() == 1
+        assert verify_stats() == []
+    assert not spool.exists()
+
+
+def test_spool_keeps_only_pending_entries(buffered_app):
+    targets = pick_targets(buffered_app)
+    pending = make_entry(buffered_app, targets)
+
+    def spooled():
+        with open(result_writer._spool_path, encoding='utf-8') as f:
+            return [json.loads(line)['submission_id'] for line in f if line.strip()]
+
+    with result_writer._lock:
+        result_writer._spool.write(json.dumps(_dump_entry(make_entry(buffered_app, targets))) + '\n')
+        result_writer._pending[pending['student_id']] = [pending]
+        result_writer._compact_spool()
+    assert spooled() == [pending['submission_id']]
+
+    with result_writer._lock:
+        result_writer._pending.clear()
+        result_writer._compact_spool()
+    assert os.path.getsize(result_writer._spool_path) == 0